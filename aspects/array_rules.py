@@ -0,0 +1,143 @@
+"""Dependency rules of `find_aspects` evaluated on `Doc.to_array` columns.
+
+The token based rules visit `token.children` and `token.head.children`
+through spaCy's Python `Token` objects for every token. Here the LOWER, ORTH,
+DEP, POS and HEAD columns of each doc are exported once as a NumPy array and
+everything that does not depend on the order of the rules (opinion polarity,
+number of opinion modifiers and negations of each token, children of each
+token) is calculated with array operations. What remains is a short loop over
+the opinion words of the doc that produces exactly the same Counters as
+`find_aspects.sentiment_aspects` and `dependencies.feature_sentiment`.
+"""
+import collections
+import time
+import numpy as np
+from aspects import lexicon
+from spacy import attrs, symbols, tokens
+from typing import Iterable, List
+
+_COLUMNS = [attrs.LOWER, attrs.ORTH, attrs.DEP, attrs.POS, attrs.HEAD]
+_AMOD = lexicon.string_id("amod")
+_ADVMOD = lexicon.string_id("advmod")
+_NEG = lexicon.string_id("neg")
+_DOBJ = lexicon.string_id("dobj")
+_COMPOUND = lexicon.string_id("compound")
+_AND = lexicon.string_id("and")
+
+
+class DocArrays:
+  """Columns of a doc and the quantities that the rules need per token."""
+
+  def __init__(self, doc: tokens.Doc, opinion_lexicon: lexicon.OpinionLexicon):
+    self.strings = doc.vocab.strings
+    n = len(doc)
+    array = doc.to_array(_COLUMNS).reshape((n, len(_COLUMNS)))
+    self.lower = array[:, 0]
+    self.orth = array[:, 1]
+    self.dep = array[:, 2]
+    self.pos = array[:, 3]
+    # HEAD is the relative position of the head as a wrapped unsigned integer
+    positions = np.arange(n)
+    self.heads = positions + array[:, 4].astype(np.int64)
+
+    self.polarity = opinion_lexicon.polarity_array(self.lower)
+    is_mod = (self.dep == _AMOD) | (self.dep == _ADVMOD)
+    is_child = self.heads != positions
+    # Number of children of each token that are opinion modifiers/negations
+    opinion_mod = is_child & is_mod & (self.polarity != 0)
+    self.n_mods = np.bincount(self.heads[opinion_mod], minlength=n)
+    negation = is_child & (self.dep == _NEG)
+    self.n_negs = np.bincount(self.heads[negation], minlength=n)
+
+    # Children of each token in document order
+    order = np.argsort(self.heads[is_child], kind="stable")
+    self._children = positions[is_child][order]
+    self._starts = np.searchsorted(self.heads[is_child][order],
+                                   np.arange(n + 1))
+
+  def children(self, i: int) -> List[int]:
+    return self._children[self._starts[i]:self._starts[i + 1]].tolist()
+
+  def lower_(self, i: int) -> str:
+    return self.strings[int(self.lower[i])]
+
+  def text(self, i: int) -> str:
+    return self.strings[int(self.orth[i])]
+
+  def apply_modifiers(self, sentiment, i: int):
+    """Multiplies sentiment as the token based rules do for token `i`."""
+    for _ in range(int(self.n_mods[i])):
+      sentiment *= 1.5
+    if self.n_negs[i] % 2:
+      sentiment *= -1
+    return sentiment
+
+
+def doc_aspects(doc: tokens.Doc, compound_only: bool = True
+                ) -> collections.Counter:
+  """Finds feature words and the corresponding sentiment in a single doc.
+
+  Args:
+    doc: spaCy doc of a review text.
+    compound_only: If True nouns are counted only when they have a compound
+      child, like `find_aspects.doc_aspects` does. If False every noun is
+      counted, like `dependencies.feature_sentiment` does.
+
+  Returns:
+    A counter where keys are the features and the values are the
+      corresponding sentiment scores.
+  """
+  sent_dict = collections.Counter()
+  if not len(doc):
+    return sent_dict
+  arrays = DocArrays(doc, lexicon.get_lexicon())
+  # Opinion words that are not adverb modifiers
+  opinion_ids = np.where((arrays.polarity != 0) & (arrays.dep != _ADVMOD))[0]
+
+  dep, pos, heads = arrays.dep.tolist(), arrays.pos.tolist(), arrays.heads
+  for i in opinion_ids.tolist():
+    sentiment = int(arrays.polarity[i])
+    head = int(heads[i])
+    if dep[i] == _AMOD:
+      sent_dict[arrays.lower_(head)] += sentiment
+      continue
+
+    sentiment = arrays.apply_modifiers(sentiment, i)
+    if pos[i] == symbols.VERB:
+      for child in arrays.children(i):
+        if dep[child] == _DOBJ:
+          sent_dict[arrays.lower_(child)] += sentiment
+          # check for conjugates (a AND b), then add both to dictionary
+          subchildren = []
+          conj = 0
+          for subchild in arrays.children(child):
+            if arrays.lower[subchild] == _AND: conj = 1
+            if (conj == 1) and (arrays.lower[subchild] != _AND):
+              subchildren.append(arrays.lower_(subchild))
+              conj = 0
+          for subchild in subchildren:
+            sent_dict[subchild] += sentiment
+
+    sentiment = arrays.apply_modifiers(sentiment, head)
+    for child in arrays.children(head):
+      if pos[child] == symbols.NOUN and arrays.text(child) not in sent_dict:
+        noun = arrays.lower_(child)
+        # Check for compound nouns
+        for subchild in arrays.children(child):
+          if dep[subchild] == _COMPOUND:
+            noun = arrays.lower_(subchild) + " " + noun
+            if compound_only:
+              sent_dict[noun] += sentiment
+        if not compound_only:
+          sent_dict[noun] += sentiment
+  return collections.Counter(sent_dict)
+
+
+def sentiment_aspects(docs: Iterable[tokens.Doc]) -> List[collections.Counter]:
+  """Same as `find_aspects.sentiment_aspects` using the array rules."""
+  start_time = time.time()
+  sent_dict_list = [doc_aspects(doc) for doc in docs]
+
+  print("\nFound aspects on {} reviews.".format(len(sent_dict_list)))
+  print(time.time() - start_time)
+  return sent_dict_list
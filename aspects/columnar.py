@@ -0,0 +1,129 @@
+"""Long format columnar storage of the aspects of each review.
+
+Instead of a pickled `collections.Counter` per review, aspects are saved as
+a table with one row per (review_id, aspect, score). The table is saved in
+Parquet if `pyarrow` is installed, otherwise as an `.npz` file with the
+aspects dictionary encoded:
+
+  review_id: int64 array with the review of each row.
+  aspect: int32 array with the position of each aspect in `vocabulary`.
+  score: float64 array with the sentiment scores.
+  vocabulary: Array with the unique aspect strings.
+
+Both formats allow reading only some of the columns and only the rows of
+some reviews without unpickling any Python objects.
+"""
+import collections
+import os
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Sequence
+
+COLUMNS = ["review_id", "aspect", "score"]
+SUFFIX = "_aspects"
+
+
+def has_parquet() -> bool:
+  try:
+    import pyarrow
+  except ImportError:
+    return False
+  return True
+
+
+def to_table(aspects: Iterable[collections.Counter],
+             review_ids: Sequence[int]) -> pd.DataFrame:
+  """Creates the long table from one aspects Counter per review.
+
+  Rows follow the order of the reviews and the order of the aspects in each
+  Counter. Aspects that are not strings and reviews without aspects (eg.
+  `None`) have no rows.
+  """
+  ids, words, scores = [], [], []
+  for review_id, counter in zip(review_ids, aspects):
+    if not counter:
+      continue
+    for word, score in counter.items():
+      if isinstance(word, str):
+        ids.append(review_id)
+        words.append(word)
+        scores.append(score)
+  return pd.DataFrame({"review_id": np.array(ids, dtype=np.int64),
+                       "aspect": pd.Categorical(words),
+                       "score": np.array(scores, dtype=np.float64)})
+
+
+def to_counters(table: pd.DataFrame, review_ids: Sequence[int]
+                ) -> List[collections.Counter]:
+  """Inverse of `to_table`: aspects Counter of each of `review_ids`."""
+  counters = {review_id: collections.Counter() for review_id in review_ids}
+  for review_id, word, score in zip(table["review_id"].values.tolist(),
+                                    np.asarray(table["aspect"]).tolist(),
+                                    table["score"].values.tolist()):
+    if review_id in counters:
+      counters[review_id][word] += score
+  return [counters[review_id] for review_id in review_ids]
+
+
+def find_path(prefix: str) -> Optional[str]:
+  """Path of the saved table for `prefix` or `None` if it does not exist."""
+  for extension in [".parquet", ".npz"]:
+    path = "{}{}{}".format(prefix, SUFFIX, extension)
+    if os.path.exists(path):
+      return path
+  return None
+
+
+def save(table: pd.DataFrame, prefix: str) -> str:
+  """Saves the table next to `prefix` and returns the path of the file."""
+  if has_parquet():
+    path = "{}{}.parquet".format(prefix, SUFFIX)
+    table.to_parquet(path, index=False)
+  else:
+    path = "{}{}.npz".format(prefix, SUFFIX)
+    aspects = pd.Categorical(table["aspect"])
+    np.savez(path, review_id=table["review_id"].values.astype(np.int64),
+             aspect=aspects.codes.astype(np.int32),
+             score=table["score"].values.astype(np.float64),
+             vocabulary=np.array(aspects.categories, dtype=str))
+  print("Saved {} aspect rows to {}.".format(len(table), path))
+  return path
+
+
+def load(prefix: str, columns: Optional[Sequence[str]] = None,
+         review_ids: Optional[Sequence[int]] = None) -> pd.DataFrame:
+  """Loads the table saved next to `prefix`.
+
+  Args:
+    prefix: Path prefix used in `save`.
+    columns: Columns to load. All columns are loaded if `None`.
+    review_ids: If given only the rows of these reviews are loaded.
+  """
+  path = find_path(prefix)
+  if path is None:
+    raise FileNotFoundError("No columnar aspects found for {}.".format(prefix))
+  columns = list(COLUMNS if columns is None else columns)
+
+  if path.endswith(".parquet"):
+    read_columns = list(columns)
+    if review_ids is not None and "review_id" not in read_columns:
+      read_columns.append("review_id")
+    filters = None
+    if review_ids is not None:
+      filters = [("review_id", "in", list(review_ids))]
+    table = pd.read_parquet(path, columns=read_columns, filters=filters)
+    return table[columns].reset_index(drop=True)
+
+  # Arrays of an `.npz` file are read from the file only when accessed
+  with np.load(path) as file:
+    keep = slice(None)
+    if review_ids is not None:
+      keep = np.isin(file["review_id"], np.asarray(review_ids))
+    table = {}
+    for column in columns:
+      if column == "aspect":
+        table[column] = pd.Categorical.from_codes(file["aspect"][keep],
+                                                  file["vocabulary"])
+      else:
+        table[column] = file[column][keep]
+  return pd.DataFrame(table, columns=columns)
@@ -1,14 +1,30 @@
 """Tools that collect all aspects of a listing/hotel."""
 import collections
+import collections.abc
+import concurrent.futures
 import functools
+import io
+import itertools
 import pickle
 import numpy as np
 import pandas as pd
-import nltk
-import plotly.graph_objects as go
-from plotly import subplots
-from aspects import distance_matrix
-from typing import Dict, Optional, Set
+from scipy import sparse
+from aspects import columnar, distance_matrix
+from utils import parallel
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+# plotly and nltk are slow to import and are only needed by some methods,
+# so they are imported when these methods are first used
+
+# Ranks are `review * RANK_STRIDE + row of the aspect in the review`, so they
+# order aspects the same way in every shard of the reviews
+RANK_STRIDE = 2 ** 20
+
+
+@functools.lru_cache(maxsize=None)
+def english_stopwords() -> FrozenSet[str]:
+  """NLTK english stopwords loaded once per process."""
+  import nltk
+  return frozenset(nltk.corpus.stopwords.words("english"))
 
 
 def transform_to_single_words(aspects: collections.Counter
@@ -24,58 +40,386 @@ def transform_to_single_words(aspects: collections.Counter
     return None
 
 
+class ArrayCounter(collections.abc.Mapping):
+  """Read-only `collections.Counter` view of an array with a value per aspect.
+
+  Aspects are present if their rank is non-negative. Iteration follows the
+  rank, which is the order in which aspects were first added, so
+  `most_common` orders ties exactly like a `Counter` does.
+  """
+
+  def __init__(self, vocabulary: List[str], word_ids: Dict[str, int],
+               values: np.ndarray, ranks: np.ndarray):
+    self.vocabulary = vocabulary
+    self.word_ids = word_ids
+    self.values = values
+    self.ranks = ranks
+
+  def ids(self) -> np.ndarray:
+    """IDs of the present aspects in iteration order."""
+    present = np.where(self.ranks >= 0)[0]
+    return present[np.argsort(self.ranks[present], kind="stable")]
+
+  def __getitem__(self, word: str):
+    # Missing aspects count zero like in a `Counter`
+    if word not in self:
+      return 0
+    return self.values[self.word_ids[word]].item()
+
+  def get(self, word: str, default=None):
+    return self[word] if word in self else default
+
+  def __contains__(self, word: str) -> bool:
+    i = self.word_ids.get(word)
+    return i is not None and self.ranks[i] >= 0
+
+  def __iter__(self) -> Iterator[str]:
+    return (self.vocabulary[i] for i in self.ids().tolist())
+
+  def __len__(self) -> int:
+    return int(np.count_nonzero(self.ranks >= 0))
+
+  def most_common(self, n: Optional[int] = None) -> List[Tuple[str, Any]]:
+    ids = self.ids()
+    ids = ids[np.argsort(-self.values[ids], kind="stable")][:n]
+    return list(zip([self.vocabulary[i] for i in ids.tolist()],
+                    self.values[ids].tolist()))
+
+  def to_counter(self) -> collections.Counter:
+    """Copy of the view as an actual `Counter`."""
+    return collections.Counter(dict(zip(self, self.values[self.ids()].tolist())))
+
+  def __repr__(self) -> str:
+    return "ArrayCounter({})".format(dict(self.most_common()))
+
+
+class ReviewMap(collections.abc.Mapping):
+  """Read-only view of the review matrix as `{aspect: {review: score}}`.
+
+  Each value is a `Counter` from review position to the total score of the
+  aspect in this review, created from the matrix row when accessed. Review
+  positions are in increasing order.
+  """
+
+  def __init__(self, container: "AspectContainers"):
+    self.container = container
+
+  def __getitem__(self, word: str) -> collections.Counter:
+    if word not in self:
+      raise KeyError(word)
+    row = self.container.review_matrix[self.container.word_ids[word]]
+    return collections.Counter(dict(zip(row.indices.tolist(),
+                                        row.data.tolist())))
+
+  def __contains__(self, word: str) -> bool:
+    i = self.container.word_ids.get(word)
+    return i is not None and bool(self.container.present[i])
+
+  def __iter__(self) -> Iterator[str]:
+    vocabulary = self.container.vocabulary
+    return (vocabulary[i] for i in np.where(self.container.present)[0].tolist())
+
+  def __len__(self) -> int:
+    return int(np.count_nonzero(self.container.present))
+
+
+def review_matrix(ids: np.ndarray, reviews: np.ndarray, scores: np.ndarray,
+                  shape: Tuple[int, int]) -> sparse.csr_matrix:
+  """Aspects x reviews CSR matrix with the total score of each pair.
+
+  Scores of the same (aspect, review) pair are added. Pairs with zero total
+  score are kept as explicit entries because the aspect was still found in
+  the review.
+  """
+  matrix = sparse.coo_matrix((scores, (ids, reviews)), shape=shape).tocsr()
+  matrix.sum_duplicates()
+  return matrix
+
+
+def merge_rows(matrix: sparse.csr_matrix, new_ids: np.ndarray, n: int
+               ) -> sparse.csr_matrix:
+  """Adds the rows of a review matrix that map to the same new row.
+
+  Args:
+    matrix: Aspects x reviews matrix.
+    new_ids: New row of each row of `matrix` or -1 to drop the row.
+    n: Number of rows of the new matrix.
+  """
+  matrix = matrix.tocoo()
+  rows = new_ids[matrix.row]
+  keep = rows >= 0
+  return review_matrix(rows[keep], matrix.col[keep], matrix.data[keep],
+                       (n, matrix.shape[1]))
+
+
 class AspectContainers:
+  """Scores and appearances of each aspect held in arrays.
+
+  Aspects are interned to integer IDs (positions in `vocabulary`). Row 0 of
+  each array is for negative (and zero) and row 1 for positive scores:
+
+    scores: Sum of the scores of each aspect.
+    appearances: Number of times each aspect was found.
+    ranks: Order in which each aspect was first found with this sign or -1
+      if it was never found with this sign.
+
+  The Counter style properties (eg. `pos_scores` or `appearances`) are
+  `ArrayCounter` views of these arrays.
+
+  Containers of different shards of the reviews are combined with `merge`.
+  `review_offset` is the position of the first review of the containers in
+  all reviews.
+
+  The reviews that mention each aspect are held in `review_matrix`, a CSR
+  matrix of shape (number of aspects, number of reviews) with the total
+  score of each aspect in each review. `map` gives the old dictionary view
+  of this matrix.
+  """
 
   def __init__(self,
-               neg_scores: collections.Counter,
-               pos_scores: collections.Counter,
-               neg_appearances: collections.Counter,
-               pos_appearances: collections.Counter,
-               review_map: Dict[str, collections.Counter]):
-    self.map = review_map
-    self._pos_scores = pos_scores
-    self._neg_scores = neg_scores
-    self._pos_appearances = pos_appearances
-    self._neg_appearances = neg_appearances
-    self.counters = ["_neg_scores", "_pos_scores",
-                     "_neg_appearances", "_pos_appearances"]
+               vocabulary: List[str],
+               scores: np.ndarray,
+               appearances: np.ndarray,
+               ranks: np.ndarray,
+               matrix: sparse.csr_matrix,
+               review_offset: int = 0):
+    self.vocabulary = list(vocabulary)
+    self.word_ids = {word: i for i, word in enumerate(self.vocabulary)}
+    self.score_array = scores
+    self.appearance_array = appearances
+    self.rank_array = ranks
+    self.review_matrix = sparse.csr_matrix(matrix)
+    self.review_offset = review_offset
+
+  @classmethod
+  def from_counters(cls,
+                    neg_scores: collections.Counter,
+                    pos_scores: collections.Counter,
+                    neg_appearances: collections.Counter,
+                    pos_appearances: collections.Counter,
+                    review_map: Dict[str, collections.Counter]):
+    """Creates from the four Counters and review map used before the arrays."""
+    vocabulary = list(pos_appearances)
+    vocabulary.extend(word for word in neg_appearances
+                      if word not in pos_appearances)
+    word_ids = {word: i for i, word in enumerate(vocabulary)}
+    n = len(vocabulary)
+    scores = np.zeros((2, n))
+    appearances = np.zeros((2, n), dtype=np.int64)
+    ranks = -np.ones((2, n), dtype=np.int64)
+    for sign, (score_counter, appearance_counter) in enumerate(
+        [(neg_scores, neg_appearances), (pos_scores, pos_appearances)]):
+      for rank, (word, count) in enumerate(appearance_counter.items()):
+        i = word_ids[word]
+        appearances[sign, i] = count
+        scores[sign, i] = score_counter[word]
+        ranks[sign, i] = rank
+    return cls(vocabulary, scores, appearances, ranks,
+               cls._map_to_matrix(review_map, word_ids))
+
+  @staticmethod
+  def _map_to_matrix(review_map: Dict[str, collections.Counter],
+                     word_ids: Dict[str, int]) -> sparse.csr_matrix:
+    ids, reviews, scores = [], [], []
+    for word, counter in review_map.items():
+      ids.extend(word_ids[word] for _ in range(len(counter)))
+      reviews.extend(counter.keys())
+      scores.extend(counter.values())
+    n_reviews = max(reviews, default=-1) + 1
+    return review_matrix(np.array(ids, dtype=np.int64),
+                         np.array(reviews, dtype=np.int64),
+                         np.array(scores, dtype=np.float64),
+                         (len(word_ids), n_reviews))
+
+  def _view(self, values: np.ndarray, ranks: np.ndarray) -> ArrayCounter:
+    return ArrayCounter(self.vocabulary, self.word_ids, values, ranks)
+
+  @property
+  def _either_ranks(self) -> np.ndarray:
+    # Ranks of the sum of positive and negative Counters: positive aspects
+    # first and then aspects that are only negative
+    neg_ranks = self.rank_array[0] + self.rank_array[1].max(initial=-1) + 1
+    return np.where(self.rank_array[1] >= 0, self.rank_array[1],
+                    np.where(self.rank_array[0] >= 0, neg_ranks, -1))
 
   def __len__(self) -> int:
-    return len(self.appearances)
+    return int(np.count_nonzero(self.appearance_array.sum(axis=0) > 0))
+
+  @property
+  def present(self) -> np.ndarray:
+    """Boolean mask of the vocabulary aspects that are in the containers."""
+    return (self.rank_array >= 0).any(axis=0)
 
   @property
   def words(self) -> Set[str]:
-    return set(self._pos_scores) | set(self._neg_scores)
+    return {self.vocabulary[i] for i in np.where(self.present)[0].tolist()}
 
   @property
-  def appearances(self) -> collections.Counter:
-    return self._pos_appearances + self._neg_appearances
+  def n_reviews(self) -> int:
+    return self.review_matrix.shape[1]
 
   @property
-  def scores(self) -> collections.Counter:
-    scores = collections.Counter(self._pos_scores)
-    scores.update(self._neg_scores)
-    return scores
+  def map(self) -> ReviewMap:
+    return ReviewMap(self)
+
+  def reviews(self, word: str) -> np.ndarray:
+    """Positions of the reviews that mention an aspect."""
+    if word not in self.map:
+      return np.array([], dtype=np.int64)
+    return self.review_matrix[self.word_ids[word]].indices.astype(np.int64)
+
+  def review_aspects(self, review: int) -> collections.Counter:
+    """Aspects of a review with their total score in this review."""
+    column = self.review_matrix[:, review].tocoo()
+    return collections.Counter({self.vocabulary[i]: score for i, score in
+                                zip(column.row.tolist(), column.data.tolist())
+                                if self.present[i]})
 
   @property
-  def pos_scores(self) -> collections.Counter:
-    return self._pos_scores
+  def appearances(self) -> ArrayCounter:
+    return self._view(self.appearance_array.sum(axis=0), self._either_ranks)
 
   @property
-  def neg_scores(self) -> collections.Counter:
-    return collections.Counter({k: -v for k, v in self._neg_scores.items()})
+  def scores(self) -> ArrayCounter:
+    return self._view(self.score_array.sum(axis=0), self._either_ranks)
 
   @property
-  def pos_appearances(self) -> collections.Counter:
-    return self._pos_appearances
+  def pos_scores(self) -> ArrayCounter:
+    return self._view(self.score_array[1], self.rank_array[1])
 
   @property
-  def neg_appearances(self) -> collections.Counter:
-    return self._neg_appearances
+  def neg_scores(self) -> ArrayCounter:
+    return self._view(-self.score_array[0], self.rank_array[0])
+
+  @property
+  def pos_appearances(self) -> ArrayCounter:
+    return self._view(self.appearance_array[1], self.rank_array[1])
+
+  @property
+  def neg_appearances(self) -> ArrayCounter:
+    return self._view(self.appearance_array[0], self.rank_array[0])
+
+  def with_offset(self, review_offset: int) -> "AspectContainers":
+    """The same containers with their reviews starting at `review_offset`."""
+    return AspectContainers(self.vocabulary, self.score_array,
+                            self.appearance_array, self.rank_array,
+                            self.review_matrix, review_offset)
+
+  def merge(self, other: "AspectContainers") -> "AspectContainers":
+    """Containers of the reviews of both containers.
+
+    Reviews of each containers are placed at their `review_offset`, so the
+    result is the same as creating the containers from all reviews.
+    Merging is associative and commutative (up to rounding of float sums):
+    the vocabulary and ranks are ordered by the first review where each
+    aspect is found and not by the order of the merges.
+    """
+    offset = min(self.review_offset, other.review_offset)
+    end = max(self.review_offset + self.n_reviews,
+              other.review_offset + other.n_reviews)
+    containers = [self, other]
+
+    # Ranks of the present aspects relative to the new offset
+    missing = np.iinfo(np.int64).max
+    words, ranks = [], []
+    for container in containers:
+      present = np.where(container.present)[0]
+      shift = (container.review_offset - offset) * RANK_STRIDE
+      rank_array = container.rank_array[:, present]
+      words.extend(container.vocabulary[i] for i in present.tolist())
+      ranks.append(np.where(rank_array >= 0, rank_array + shift, missing))
+    ranks = np.concatenate(ranks, axis=1)
+    codes, uniques = pd.factorize(pd.Series(words, dtype=object))
+    n = len(uniques)
+
+    # Vocabulary ordered by the first appearance of each aspect
+    first = np.full(n, missing)
+    np.minimum.at(first, codes, ranks.min(axis=0))
+    order = sorted(range(n), key=lambda i: (first[i], uniques[i]))
+    vocabulary = [uniques[i] for i in order]
+    new_ids = np.empty(n, dtype=np.int64)
+    new_ids[order] = np.arange(n)
+    codes = new_ids[codes]
+
+    scores = np.zeros((2, n))
+    appearances = np.zeros((2, n), dtype=np.int64)
+    rank_array = np.full((2, n), missing)
+    rows, columns, data = [], [], []
+    start = 0
+    for container in containers:
+      present = np.where(container.present)[0]
+      ids = codes[start:start + len(present)]
+      container_ranks = ranks[:, start:start + len(present)]
+      start += len(present)
+      scores[:, ids] += container.score_array[:, present]
+      appearances[:, ids] += container.appearance_array[:, present]
+      rank_array[:, ids] = np.minimum(rank_array[:, ids], container_ranks)
+      # Rows of aspects that are not present are dropped
+      row_map = -np.ones(len(container.vocabulary), dtype=np.int64)
+      row_map[present] = ids
+      matrix = container.review_matrix.tocoo()
+      keep = row_map[matrix.row] >= 0
+      rows.append(row_map[matrix.row][keep])
+      columns.append(matrix.col[keep] + container.review_offset - offset)
+      data.append(matrix.data[keep])
+    rank_array[rank_array == missing] = -1
+
+    matrix = review_matrix(np.concatenate(rows), np.concatenate(columns),
+                           np.concatenate(data), (n, end - offset))
+    return AspectContainers(vocabulary, scores, appearances, rank_array,
+                            matrix, offset)
+
+  def extend(self, other: "AspectContainers") -> "AspectContainers":
+    """Containers with the reviews of `other` after the reviews of these."""
+    return self.merge(other.with_offset(self.review_offset + self.n_reviews))
+
+  def to_bytes(self, compress: bool = True) -> bytes:
+    """Binary format of the containers without pickled objects.
+
+    Args:
+      compress: If True the arrays are compressed, which makes the format
+        about five times smaller but slower to write.
+    """
+    matrix = self.review_matrix
+    vocabulary = "\0".join(self.vocabulary).encode("utf-8")
+    buffer = io.BytesIO()
+    savez = np.savez_compressed if compress else np.savez
+    savez(buffer, vocabulary=np.frombuffer(vocabulary, dtype=np.uint8),
+          scores=self.score_array, appearances=self.appearance_array,
+          ranks=self.rank_array, data=matrix.data, indices=matrix.indices,
+          indptr=matrix.indptr,
+          shape=np.array(matrix.shape + (self.review_offset,)))
+    return buffer.getvalue()
+
+  @classmethod
+  def from_bytes(cls, data: bytes) -> "AspectContainers":
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+      vocabulary = arrays["vocabulary"].tobytes().decode("utf-8")
+      vocabulary = vocabulary.split("\0") if vocabulary else []
+      n_words, n_reviews, offset = arrays["shape"].tolist()
+      matrix = sparse.csr_matrix(
+          (arrays["data"], arrays["indices"], arrays["indptr"]),
+          shape=(n_words, n_reviews))
+      return AspectContainers(vocabulary, arrays["scores"],
+                              arrays["appearances"], arrays["ranks"], matrix,
+                              offset)
+
+  def __getstate__(self) -> bytes:
+    # Containers are sent between processes in the binary format. Compression
+    # costs more time than it saves when sending to a local process.
+    return self.to_bytes(compress=False)
+
+  def __setstate__(self, state: bytes):
+    self.__dict__.update(self.from_bytes(state).__dict__)
 
   def save(self, savedir: str):
-    containers = [getattr(self, a) for a in self.counters]
-    containers.append(self.map)
+    matrix = self.review_matrix
+    containers = {"vocabulary": self.vocabulary, "scores": self.score_array,
+                  "review_offset": self.review_offset,
+                  "appearances": self.appearance_array,
+                  "ranks": self.rank_array,
+                  "review_matrix": (matrix.data, matrix.indices,
+                                    matrix.indptr, matrix.shape)}
     with open(".".join([savedir, "pkl"]), "wb") as file:
       pickle.dump(containers, file)
 
@@ -83,7 +427,14 @@ class AspectContainers:
   def load(cls, loaddir: str):
     with open(".".join([loaddir, "pkl"]), "rb") as file:
       containers = pickle.load(file)
-    return cls(*containers)
+    if isinstance(containers, list):
+      # Containers saved as four Counters and the map
+      return cls.from_counters(*containers)
+    data, indices, indptr, shape = containers["review_matrix"]
+    return cls(containers["vocabulary"], containers["scores"],
+               containers["appearances"], containers["ranks"],
+               sparse.csr_matrix((data, indices, indptr), shape=shape),
+               containers.get("review_offset", 0))
 
   def common_positive(self, start: int = 0, end: int = 30):
     for (word, score) in self.pos_scores.most_common()[start: end]:
@@ -95,6 +446,8 @@ class AspectContainers:
 
   def get_figure(self, score_type: str ="scores",
                  start: int = 0, end: int = 20):
+    import plotly.graph_objects as go
+    from plotly import subplots
     get_bar = functools.partial(self.get_plot_bar, score_type=score_type,
                                 start=start, end=end)
 
@@ -117,7 +470,9 @@ class AspectContainers:
     return fig
 
   def get_plot_bar(self, sentiment: str = "pos", score_type: str = "scores",
-                   start: int = 0, end: int = 20) -> go.Bar:
+                   start: int = 0, end: int = 20
+                   ) -> "plotly.graph_objects.Bar":
+    import plotly.graph_objects as go
     aspects = getattr(self, "_".join([sentiment, score_type]))
     bar_plot_words = aspects.most_common()[start: end]
     bar_plot_words = [word for word, _ in bar_plot_words]
@@ -128,47 +483,205 @@ class AspectContainers:
                   orientation="h", name=name)
 
 
+def _merge(containers1: AspectContainers, containers2: AspectContainers
+           ) -> AspectContainers:
+  return containers1.merge(containers2)
+
+
+def tree_reduce(containers: Sequence[AspectContainers],
+                executor: Optional[concurrent.futures.Executor] = None
+                ) -> AspectContainers:
+  """Merges containers in pairs until a single one is left.
+
+  Args:
+    containers: Containers to merge, eg. one for each shard of the reviews.
+    executor: If given, the merges of each level of the tree run in
+      parallel in this executor.
+  """
+  containers = list(containers)
+  if not containers:
+    raise ValueError("There are no containers to merge.")
+  while len(containers) > 1:
+    pairs = list(zip(containers[::2], containers[1::2]))
+    if executor is None:
+      merged = [_merge(*pair) for pair in pairs]
+    else:
+      merged = list(executor.map(_merge, *zip(*pairs)))
+    if len(containers) % 2:
+      merged.append(containers[-1])
+    containers = merged
+  return containers[0]
+
+
 class MergedAspectContainers(AspectContainers):
 
   def __init__(self, word_map: Dict[str, str], *args):
     self.word_map = word_map
     super(MergedAspectContainers, self).__init__(*args)
 
+  def __getstate__(self) -> Tuple[bytes, Dict[str, str]]:
+    return super(MergedAspectContainers, self).__getstate__(), self.word_map
+
+  def __setstate__(self, state: Tuple[bytes, Dict[str, str]]):
+    super(MergedAspectContainers, self).__setstate__(state[0])
+    self.word_map = state[1]
+
   @classmethod
   def create(cls, word_map: Dict[str, str], container: AspectContainers):
-    new_containers = [collections.Counter() for _ in range(4)]
-    new_map = dict()
-    for (word, _) in container.appearances.most_common():
-      new_word = word_map[word] if word in word_map else word
-      # Merge counters
-      for i, c in enumerate(container.counters):
-        new_containers[i][new_word] += getattr(container, c)[word]
-      # Merge map
-      if new_word in new_map:
-        new_map[new_word].update(container.map[word])
-      else:
-        new_map[new_word] = container.map[word]
-
-    new_containers.append(new_map)
-    return cls(word_map, *new_containers)
+    # Merged words are ordered by the most common word that maps to them
+    ids = np.array([container.word_ids[word] for word, _ in
+                    container.appearances.most_common()], dtype=np.int64)
+    new_words = [word_map.get(word, word)
+                 for word in (container.vocabulary[i] for i in ids.tolist())]
+    new_ids, vocabulary = pd.factorize(pd.Series(new_words, dtype=object))
+    n = len(vocabulary)
+
+    # Merge arrays, every merged word is present in both signs
+    scores = np.zeros((2, n))
+    np.add.at(scores, (slice(None), new_ids), container.score_array[:, ids])
+    appearances = np.zeros((2, n), dtype=np.int64)
+    np.add.at(appearances, (slice(None), new_ids),
+              container.appearance_array[:, ids])
+    ranks = np.tile(np.arange(n), (2, 1))
+
+    # Merge review matrix rows
+    row_map = -np.ones(len(container.vocabulary), dtype=np.int64)
+    row_map[ids] = new_ids
+    matrix = merge_rows(container.review_matrix, row_map, n)
+
+    return cls(word_map, list(vocabulary), scores, appearances, ranks, matrix)
 
   def merge_words(self, word1: str, word2: str):
     """Manually merge of word2 to word1."""
     if word1 in self.words and word2 in self.words:
-      # Merge map
-      self.map[word1].update(self.map.pop(word2))
-      # Merge counters
-      for c in self.counters:
-        counter = getattr(self, c)
-        setattr(self, c, self._merge_words(counter, word1, word2))
-
-  @staticmethod
-  def _merge_words(counter: collections.Counter, word1: str, word2: str
-                   ) -> collections.Counter:
-    if word1 not in counter or word2 not in counter:
-      return counter
-    counter[word1] += counter.pop(word2)
-    return counter
+      i, j = self.word_ids[word1], self.word_ids[word2]
+      # Merge review matrix rows
+      row_map = np.arange(len(self.vocabulary))
+      row_map[j] = i
+      self.review_matrix = merge_rows(self.review_matrix, row_map,
+                                      len(self.vocabulary))
+      # Merge arrays of each sign where both words are present
+      for sign in range(2):
+        if self.rank_array[sign, i] >= 0 and self.rank_array[sign, j] >= 0:
+          self.score_array[sign, i] += self.score_array[sign, j]
+          self.appearance_array[sign, i] += self.appearance_array[sign, j]
+          self.score_array[sign, j] = 0
+          self.appearance_array[sign, j] = 0
+          self.rank_array[sign, j] = -1
+
+
+def create_container(rows: Iterable[Tuple[int, str, float]],
+                     n_reviews: Optional[int] = None) -> AspectContainers:
+  """Collects aspects to containers.
+
+  Args:
+    rows: Iterable over (review position, aspect, score) in the order of the
+      reviews. Aspects that are not strings or are stopwords are ignored.
+    n_reviews: Total number of reviews. If `None` it is one more than the
+      last review position in `rows`.
+  """
+  stopwords = english_stopwords()
+  word_ids = {}
+  ids, reviews, scores = [], [], []
+  for i, word, score in rows:
+    if isinstance(word, str) and word not in stopwords:
+      ids.append(word_ids.setdefault(word, len(word_ids)))
+      reviews.append(i)
+      scores.append(score)
+  return _create_container(list(word_ids), np.array(ids, dtype=np.int64),
+                           np.array(reviews, dtype=np.int64),
+                           np.array(scores, dtype=np.float64), n_reviews)
+
+
+def create_container_from_table(reviews: np.ndarray, words: np.ndarray,
+                                scores: np.ndarray,
+                                n_reviews: Optional[int] = None
+                                ) -> AspectContainers:
+  """Vectorized `create_container` from the columns of a long table.
+
+  Gives the same containers as `create_container` with the rows
+  `zip(reviews, words, scores)`. Strings and stopwords are checked once for
+  each distinct aspect instead of once for each row.
+  """
+  codes, uniques = pd.factorize(np.asarray(words, dtype=object))
+  valid = np.array([isinstance(word, str) for word in uniques], dtype=bool)
+  valid &= ~pd.Index(uniques).isin(english_stopwords())
+  keep = np.zeros(len(codes), dtype=bool)
+  keep[codes >= 0] = valid[codes[codes >= 0]]
+  # Order the vocabulary by first appearance among the rows kept
+  ids, order = pd.factorize(codes[keep])
+  return _create_container(uniques[order].tolist(), ids.astype(np.int64),
+                           np.asarray(reviews, dtype=np.int64)[keep],
+                           np.asarray(scores, dtype=np.float64)[keep],
+                           n_reviews)
+
+
+def _create_container(vocabulary: List[str], ids: np.ndarray,
+                      reviews: np.ndarray, scores: np.ndarray,
+                      n_reviews: Optional[int] = None) -> AspectContainers:
+  if n_reviews is None:
+    n_reviews = int(reviews.max(initial=-1)) + 1
+  n = len(vocabulary)
+  # Group rows by (sign, aspect) with flat ids sign * n + aspect
+  signs = (scores > 0).astype(np.int64)
+  groups = signs * n + ids
+  score_array = np.bincount(groups, weights=scores, minlength=2 * n)
+  appearance_array = np.bincount(groups, minlength=2 * n)
+  # Rank of each aspect is the review and the row of this review where it
+  # was first found with each sign (rows are sorted by review)
+  rank_array = -np.ones(2 * n, dtype=np.int64)
+  unique_groups, first = np.unique(groups, return_index=True)
+  review_rows = first - np.searchsorted(reviews, reviews[first])
+  rank_array[unique_groups] = reviews[first] * RANK_STRIDE + review_rows
+  matrix = review_matrix(ids, reviews, scores, (n, n_reviews))
+  return AspectContainers(vocabulary, score_array.reshape((2, n)),
+                          appearance_array.astype(np.int64).reshape((2, n)),
+                          rank_array.reshape((2, n)), matrix)
+
+
+def explode(aspects: Iterable[collections.Counter]
+            ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """Explodes aspect Counters to a long (review, aspect, score) table.
+
+  Returns the review position, aspect and score arrays of the table.
+  Reviews without aspects (eg. `None`) have no rows.
+  """
+  aspects = [counter if isinstance(counter, dict) else {}
+             for counter in aspects]
+  lengths = np.fromiter(map(len, aspects), dtype=np.int64, count=len(aspects))
+  reviews = np.repeat(np.arange(len(aspects)), lengths)
+  words = np.empty(lengths.sum(), dtype=object)
+  words[:] = list(itertools.chain.from_iterable(aspects))
+  scores = np.fromiter(itertools.chain.from_iterable(map(dict.values, aspects)),
+                       dtype=np.float64, count=len(words))
+  return reviews, words, scores
+
+
+def _shard_container(aspects: Sequence[collections.Counter],
+                     review_offset: int) -> AspectContainers:
+  container = create_container_from_table(*explode(aspects),
+                                          n_reviews=len(aspects))
+  return container.with_offset(review_offset)
+
+
+def create_container_parallel(aspects: Sequence[collections.Counter],
+                              workers: int, n_shards: Optional[int] = None
+                              ) -> AspectContainers:
+  """Creates containers from shards of the reviews in worker processes.
+
+  Args:
+    aspects: Aspects Counter of each review.
+    workers: Number of worker processes.
+    n_shards: Number of shards to split the reviews. Defaults to `workers`.
+
+  Returns:
+    The same containers as `create_container_from_table` on all reviews.
+  """
+  shards = parallel.split_shards(list(aspects), n_shards or workers)
+  offsets = np.cumsum([0] + [len(shard) for shard in shards[:-1]]).tolist()
+  with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+    containers = list(executor.map(_shard_container, shards, offsets))
+    return tree_reduce(containers, executor)
 
 
 class DataAspects:
@@ -182,41 +695,52 @@ class DataAspects:
     self.aspect_column = aspect_column_name
     self._container = container
     self.data_dir = None
+    # Long aspects table when created with `from_columnar`
+    self.table = None
 
     self._cut_off = None
     self._matrix = None
     self._merged_container = None
+    # Words added by `update` that may need a distance matrix row. They are
+    # saved with the data so that a later run can calculate their rows.
+    self._new_words = []
 
   @classmethod
   def from_dataframe(cls, data: pd.DataFrame,
-                     aspect_column_name: str = "aspects"):
+                     aspect_column_name: str = "aspects", workers: int = 1):
     # Transform phrase aspects to single words
     word_aspects = data[aspect_column_name]#.map(transform_to_single_words)
-    stopwords = set(nltk.corpus.stopwords.words("english"))
-
-    review_map = {}
-    scores = [collections.Counter(), collections.Counter()]
-    appearances = [collections.Counter(), collections.Counter()]
-    for i, aspects in enumerate(word_aspects):
-      for word, score in aspects.items():
-        if isinstance(word, str) and word not in stopwords:
-          sign = int(score > 0)
-          scores[sign][word] += score
-          appearances[sign][word] += 1
-          if word in review_map:
-            review_map[word][i] += score
-          else:
-            review_map[word] = collections.Counter({i: score})
-
-    containers = scores + appearances
-    containers.append(review_map)
-    container = AspectContainers(*containers)
+    if workers > 1:
+      container = create_container_parallel(word_aspects.tolist(), workers)
+    else:
+      container = create_container_from_table(*explode(word_aspects),
+                                              n_reviews=len(data))
     return cls(data, container, aspect_column_name)
 
   @classmethod
-  def from_pkl(cls, data_dir: str, aspect_column_name: str = "aspects"):
+  def from_columnar(cls, data_dir: str, aspect_column_name: str = "aspects"):
+    """Creates from a pickle of reviews and its columnar aspects table.
+
+    The `review_id` of the table (see `columnar`) is the index label of each
+    review in the pickled DataFrame, which does not need an aspects column.
+    """
+    data = pd.read_pickle(".".join([data_dir, "pkl"]))
+    table = columnar.load(data_dir)
+    positions = data.index.get_indexer(table["review_id"].values)
+    found = positions >= 0
+    container = create_container_from_table(
+        positions[found], np.asarray(table["aspect"], dtype=object)[found],
+        table["score"].values[found], len(data))
+    obj = cls(data, container, aspect_column_name)
+    obj.data_dir = data_dir
+    obj.table = table
+    return obj
+
+  @classmethod
+  def from_pkl(cls, data_dir: str, aspect_column_name: str = "aspects",
+               workers: int = 1):
     data = pd.read_pickle(".".join([data_dir, "pkl"]))
-    obj = cls.from_dataframe(data, aspect_column_name)
+    obj = cls.from_dataframe(data, aspect_column_name, workers)
     obj.data_dir = data_dir
     return obj
 
@@ -227,6 +751,8 @@ class DataAspects:
 
     obj = cls(data, container, aspect_column_name)
     obj.data_dir = data_dir
+    if columnar.find_path(data_dir) is not None:
+      obj.table = columnar.load(data_dir)
 
     try:
       matrix = distance_matrix.DistanceMatrix.load(
@@ -234,16 +760,27 @@ class DataAspects:
       obj.set_distance_matrix(matrix)
     except:
       pass
+    try:
+      with open("_".join([data_dir, "new_words.pkl"]), "rb") as file:
+        obj._new_words = pickle.load(file)
+    except FileNotFoundError:
+      pass
 
     return obj
 
-  def save(self):
+  def save(self, save_data: bool = False):
     if self.data_dir is None:
       raise ValueError("DataAspects save is only available when the data_dir "
                        "attribute is specified.")
+    if save_data:
+      self.data.to_pickle(".".join([self.data_dir, "pkl"]))
+      if self.table is not None:
+        columnar.save(self.table, self.data_dir)
     self.container.save("_".join([self.data_dir, "container"]))
     if self.matrix is not None:
       self.matrix.save("_".join([self.data_dir, "matrix"]))
+    with open("_".join([self.data_dir, "new_words.pkl"]), "wb") as file:
+      pickle.dump(self._new_words, file)
 
   @property
   def container(self) -> AspectContainers:
@@ -267,8 +804,91 @@ class DataAspects:
 
   @property
   def has_negative(self) -> pd.Series:
+    if self.aspect_column not in self.data and self.table is not None:
+      # Reviews without rows in the table have no aspects
+      min_score = self.table.groupby("review_id")["score"].min()
+      min_score = min_score.reindex(self.data.index)
+      labels = np.where(min_score < 0, "Negative", "Positive")
+      return pd.Series(np.where(min_score.isnull(), "N/A", labels),
+                       index=self.data.index)
     return self.data[self.aspect_column].map(self._contains_negative)
 
+  def update(self, new_data: pd.DataFrame, id_column: str = "id",
+             new_table: Optional[pd.DataFrame] = None) -> int:
+    """Adds the aspects of new reviews to the data and the container.
+
+    The aspects are read from the aspects column of `new_data` or, for
+    reviews saved by `find_aspects.py --columnar`, from their columnar
+    `new_table`, where `review_id` is the index label of `new_data`.
+    Reviews are identified by `id_column` and reviews that are already in
+    the data are skipped, so replaying the same update does nothing. New
+    reviews are labeled after the largest label of the data, so their labels
+    (and `review_id` in the columnar table) never collide with old reviews.
+    The merged container is dropped because it needs a new merge. The
+    distance matrix is kept and the new words that it is missing are in
+    `pending_words`.
+
+    Returns:
+      Number of reviews that were added.
+    """
+    if new_table is not None:
+      new_data = new_data.assign(**{self.aspect_column: columnar.to_counters(
+          new_table, new_data.index)})
+    new_data = new_data[~new_data[id_column].isin(self.data[id_column])]
+    new_data = new_data.drop_duplicates(subset=id_column)
+    if not len(new_data):
+      return 0
+    start = int(self.data.index.max()) + 1 if len(self.data) else 0
+    new_data = new_data.set_axis(pd.RangeIndex(start, start + len(new_data)))
+
+    word_aspects = new_data[self.aspect_column]
+    container = create_container_from_table(*explode(word_aspects),
+                                            n_reviews=len(new_data))
+    old_words = self._container.word_ids
+    self._container = self._container.extend(container)
+    self._new_words.extend(word for word in container.vocabulary
+                           if word not in old_words)
+    if self.table is not None:
+      # The aspects of the data are in the columnar table
+      self.table = pd.concat([self.table, columnar.to_table(
+          word_aspects, new_data.index)], ignore_index=True)
+      new_data = new_data.drop(columns=[self.aspect_column])
+    self.data = pd.concat([self.data, new_data])
+
+    self._merged_container = None
+    self._cut_off = None
+    return len(new_data)
+
+  @property
+  def pending_words(self) -> List[str]:
+    """Words added by `update` that have no row in the distance matrix.
+
+    These are the rows that `update_distance_matrix` calculates. Older words
+    without a row (eg. words that are not in the Word2Vec model) are not
+    pending, so this is empty unless an update since the last calculation
+    found new words. Words that are not in the model will still not get a
+    row.
+    """
+    if self._matrix is None:
+      return [word for word, _ in self.container.appearances.most_common()]
+    return self._matrix.missing_words(self._new_words)
+
+  def update_distance_matrix(self, model=None, min_counts: int = -1):
+    """Calculates only the distance matrix rows of pending words.
+
+    Without pending words the matrix is only reordered by the updated
+    counts, so `model` is not needed.
+    """
+    if self._matrix is None:
+      self.create_distance_matrix(model, min_counts)
+    elif self.pending_words:
+      self._matrix = self._matrix.extend(
+          model, self.container.appearances, min_counts=min_counts)
+    else:
+      self._matrix = self._matrix.reorder(self.container.appearances,
+                                          min_counts=min_counts)
+    self._new_words = []
+
   def set_distance_matrix(self, matrix: distance_matrix.DistanceMatrix):
     self._matrix = matrix
 
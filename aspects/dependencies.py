@@ -1,23 +1,38 @@
 import collections
+import hashlib
 import re
-import os
-import spacy
+from aspects import array_rules, lexicon
+from spacy import symbols, tokens
+from utils import spacy_preprocessing, stages
 from typing import Set, Tuple, Union
 
-
-def load_words(lexicon_dir: str) -> Set[str]:
-    """Loads opinion word from txt file to set."""
-    file = open(os.path.join(lexicon_dir), encoding="ISO-8859-1")
-    return set(line.strip() for line in file.readlines())
-
-_NLP = spacy.load('en_core_web_sm', parse=True, tag=True, entity=True)
-_LEXICON_DIR = "/home/stavros/GitHub/Text-Classification/opinion-lexicon"
-_POS_WORDS = load_words(os.path.join(_LEXICON_DIR, "pos_words.txt"))
-_NEG_WORDS = load_words(os.path.join(_LEXICON_DIR, "neg_words.txt"))
-_OPINION_WORDS = _POS_WORDS | _NEG_WORDS
-
-
-def feature_sentiment(sentence: str, lemmatize_text: bool = False
+# Source files of the rules of `feature_sentiment`. The rules version is the
+# hash of their content, so results cached with older rules are not used
+# (see `result_cache`) after any change to these files.
+RULE_FILES = [__file__, array_rules.__file__]
+RULES_VERSION = hashlib.sha1("".join(
+    stages.file_fingerprint(path) for path in RULE_FILES).encode()).hexdigest()
+
+# IDs of the strings that the dependency rules check
+_AMOD = lexicon.string_id("amod")
+_ADVMOD = lexicon.string_id("advmod")
+_NEG = lexicon.string_id("neg")
+_DOBJ = lexicon.string_id("dobj")
+_COMPOUND = lexicon.string_id("compound")
+_AND = lexicon.string_id("and")
+# Entities are not needed for the rules
+_COMPONENTS = ("tagger", "parser")
+
+
+def _parse(sentence: str) -> tokens.Doc:
+    """Applies the shared spaCy model with the components the rules need."""
+    nlp = spacy_preprocessing.load_nlp(_COMPONENTS)
+    return nlp(sentence,
+               disable=spacy_preprocessing.unused_components(nlp, _COMPONENTS))
+
+
+def feature_sentiment(sentence: str, lemmatize_text: bool = False,
+                      rule_engine: str = "tokens"
                       ) -> Union[collections.Counter, Tuple[collections.Counter, str]]:
     """Finds feature words and the corresponding sentiment.
 
@@ -29,70 +44,77 @@ def feature_sentiment(sentence: str, lemmatize_text: bool = False
     Args:
       sentence: A review text. Can have more than one sentence, for example
         can be a full review comment.
+      lemmatize_text: If True the lemmatized text is also returned.
+      rule_engine: "tokens" to evaluate the rules on spaCy tokens or
+        "arrays" to evaluate them on doc arrays with `array_rules`.
 
     Returns:
       A counter where keys are the features and the values are the
         corresponding sentiment scores.
     """
-    sent_dict = collections.Counter()
-    sentence = _NLP(sentence)
-    debug = 0
-    for token in sentence:
-        # check if the word is an opinion word, then assign sentiment
-        if token.text.lower() in _OPINION_WORDS:
-            sentiment = 1 if token.text.lower() in _POS_WORDS else -1
-            # if target is an adverb modifier (i.e. pretty, highly, etc.)
-            # but happens to be an opinion word, ignore and pass
-            if (token.dep_ == "advmod"):
-                continue
-            elif (token.dep_ == "amod"):
-                sent_dict[token.head.text.lower()] += sentiment
-            # for opinion words that are adjectives, adverbs, verbs...
-            else:
-                for child in token.children:
-                    # if there's a adj modifier (i.e. very, pretty, etc.) add more weight to sentiment
-                    # This could be better updated for modifiers that either positively or negatively emphasize
-                    if ((child.dep_ == "amod") or (child.dep_ == "advmod")) and (child.text.lower() in _OPINION_WORDS):
-                        sentiment *= 1.5
-                    # check for negation words and flip the sign of sentiment
-                    if child.dep_ == "neg":
-                        sentiment *= -1
-                for child in token.children:
-                    # if verb, check if there's a direct object
-                    if (token.pos_ == "VERB") & (child.dep_ == "dobj"):
-                        sent_dict[child.text.lower()] += sentiment
-                        # check for conjugates (a AND b), then add both to dictionary
-                        subchildren = []
-                        conj = 0
-                        for subchild in child.children:
-                            if subchild.text.lower() == "and":
-                                conj=1
-                            if (conj == 1) and (subchild.text.lower() != "and"):
-                                subchildren.append(subchild.text.lower())
-                                conj = 0
-                        for subchild in subchildren:
-                            sent_dict[subchild] += sentiment
-
-                # check for negation
-                for child in token.head.children:
-                    noun = ""
-                    if ((child.dep_ == "amod") or (child.dep_ == "advmod")) and (child.text.lower() in _OPINION_WORDS):
-                        sentiment *= 1.5
-                    # check for negation words and flip the sign of sentiment
-                    if (child.dep_ == "neg"):
-                        sentiment *= -1
-
-                # check for nouns
-                for child in token.head.children:
-                    noun = ""
-                    if (child.pos_ == "NOUN") and (child.text not in sent_dict):
-                        noun = child.text.lower()
-                        # Check for compound nouns
-                        for subchild in child.children:
-                            if subchild.dep_ == "compound":
-                                noun = subchild.text.lower() + " " + noun
-                        sent_dict[noun] += sentiment
-                    debug += 1
+    sentence = _parse(sentence)
+    if rule_engine == "arrays":
+        sent_dict = array_rules.doc_aspects(sentence, compound_only=False)
+    else:
+        sent_dict = collections.Counter()
+        polarity = lexicon.get_lexicon().polarity
+        debug = 0
+        for token in sentence:
+            # check if the word is an opinion word, then assign sentiment
+            sentiment = polarity.get(token.lower)
+            if sentiment is not None:
+                # if target is an adverb modifier (i.e. pretty, highly, etc.)
+                # but happens to be an opinion word, ignore and pass
+                if (token.dep == _ADVMOD):
+                    continue
+                elif (token.dep == _AMOD):
+                    sent_dict[token.head.lower_] += sentiment
+                # for opinion words that are adjectives, adverbs, verbs...
+                else:
+                    for child in token.children:
+                        # if there's a adj modifier (i.e. very, pretty, etc.) add more weight to sentiment
+                        # This could be better updated for modifiers that either positively or negatively emphasize
+                        if ((child.dep == _AMOD) or (child.dep == _ADVMOD)) and (child.lower in polarity):
+                            sentiment *= 1.5
+                        # check for negation words and flip the sign of sentiment
+                        if child.dep == _NEG:
+                            sentiment *= -1
+                    for child in token.children:
+                        # if verb, check if there's a direct object
+                        if (token.pos == symbols.VERB) & (child.dep == _DOBJ):
+                            sent_dict[child.lower_] += sentiment
+                            # check for conjugates (a AND b), then add both to dictionary
+                            subchildren = []
+                            conj = 0
+                            for subchild in child.children:
+                                if subchild.lower == _AND:
+                                    conj=1
+                                if (conj == 1) and (subchild.lower != _AND):
+                                    subchildren.append(subchild.lower_)
+                                    conj = 0
+                            for subchild in subchildren:
+                                sent_dict[subchild] += sentiment
+
+                    # check for negation
+                    for child in token.head.children:
+                        noun = ""
+                        if ((child.dep == _AMOD) or (child.dep == _ADVMOD)) and (child.lower in polarity):
+                            sentiment *= 1.5
+                        # check for negation words and flip the sign of sentiment
+                        if (child.dep == _NEG):
+                            sentiment *= -1
+
+                    # check for nouns
+                    for child in token.head.children:
+                        noun = ""
+                        if (child.pos == symbols.NOUN) and (child.text not in sent_dict):
+                            noun = child.lower_
+                            # Check for compound nouns
+                            for subchild in child.children:
+                                if subchild.dep == _COMPOUND:
+                                    noun = subchild.lower_ + " " + noun
+                            sent_dict[noun] += sentiment
+                        debug += 1
     if lemmatize_text:
         # Lemmatize using spaCy
         text = " ".join([word.lemma_ if word.lemma_ != '-PRON-' else word.text
@@ -108,29 +130,30 @@ def feature_sentiment(sentence: str, lemmatize_text: bool = False
 def find_features(sentence: str) -> Set[str]:
     """Same as above but only counts features without caring about sentiment."""
     sent_dict = set()
-    sentence = _NLP(sentence)
+    polarity = lexicon.get_lexicon().polarity
+    sentence = _parse(sentence)
     for token in sentence:
         # check if the word is an opinion word, then assign sentiment
-        if token.text in _OPINION_WORDS:
+        if token.orth in polarity:
             # if target is an adverb modifier (i.e. pretty, highly, etc.)
             # but happens to be an opinion word, ignore and pass
-            if (token.dep_ == "advmod"):
+            if (token.dep == _ADVMOD):
                 continue
-            elif (token.dep_ == "amod"):
-                sent_dict.add(token.head.text.lower())
+            elif (token.dep == _AMOD):
+                sent_dict.add(token.head.lower_)
             # for opinion words that are adjectives, adverbs, verbs...
             else:
                 for child in token.children:
                     # if verb, check if there's a direct object
-                    if (token.pos_ == "VERB") & (child.dep_ == "dobj"):
-                        sent_dict.add(child.text.lower())
+                    if (token.pos == symbols.VERB) & (child.dep == _DOBJ):
+                        sent_dict.add(child.lower_)
                         # check for conjugates (a AND b), then add both to dictionary
                         subchildren = []
                         conj = 0
                         for subchild in child.children:
-                            if subchild.text == "and":
+                            if subchild.orth == _AND:
                                 conj=1
-                            if (conj == 1) and (subchild.text != "and"):
+                            if (conj == 1) and (subchild.orth != _AND):
                                 subchildren.append(subchild.text)
                                 conj = 0
                         for subchild in subchildren:
@@ -139,11 +162,11 @@ def find_features(sentence: str) -> Set[str]:
                 # check for nouns
                 for child in token.head.children:
                     noun = ""
-                    if (child.pos_ == "NOUN") and (child.text not in sent_dict):
+                    if (child.pos == symbols.NOUN) and (child.text not in sent_dict):
                         noun = child.text
                         # Check for compound nouns
                         for subchild in child.children:
-                            if subchild.dep_ == "compound":
+                            if subchild.dep == _COMPOUND:
                                 noun = subchild.text + " " + noun
                         sent_dict.add(noun)
     return set(word.lower() for word in sent_dict)
@@ -151,15 +174,31 @@ def find_features(sentence: str) -> Set[str]:
 
 class FeatureSentimentCounter:
 
-  def __init__(self, message):
+  def __init__(self, message, cache=None):
+    """Constructor.
+
+    Args:
+      message: Every how many sentences to print a message.
+      cache: Optional `result_cache.ResultCache` with previously found
+        features of the same sentences.
+    """
     self.counter = 0
     self.message = message
+    self.cache = cache
 
   def feature_sentiment(self, sentence: str) -> collections.Counter:
     self.counter += 1
     if self.counter % self.message == 0:
       print(self.counter)
+    # Missing texts (eg. NaN) are not cached and give None below
+    if self.cache is not None and isinstance(sentence, str):
+      features = self.cache.get(sentence)
+      if features is not None:
+        return features
     try:
-      return feature_sentiment(sentence)
+      features = feature_sentiment(sentence)
     except:
-      return None
\ No newline at end of file
+      return None
+    if self.cache is not None:
+      self.cache.put(sentence, features)
+    return features
\ No newline at end of file
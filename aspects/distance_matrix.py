@@ -2,7 +2,7 @@
 import collections
 import pickle
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 
 class DistanceMatrix:
@@ -19,6 +19,18 @@ class DistanceMatrix:
   @classmethod
   def calculate(cls, model, aspects: collections.Counter, min_counts: int = -1):
     """Constructs word distance matrix from aspects counter."""
+    words = cls.select_words(model, aspects, min_counts)
+    print("Calculating matrix with {} words.".format(len(words)))
+    matrix = np.eye(len(words))
+    for i, word in enumerate(words):
+      matrix[i, i:] = model.distances(word, words[i:])
+
+    return cls(words, matrix)
+
+  @staticmethod
+  def select_words(model, aspects: collections.Counter, min_counts: int = -1
+                   ) -> List[str]:
+    """Words of the matrix ordered from the most to the least common."""
     words = []
     not_in_model = []
     n_smaller_count = 0
@@ -38,12 +50,57 @@ class DistanceMatrix:
     print("{} valid words not in the Word2Vec model.".format(len(not_in_model)))
     print("{} words have count < {} and are ignored.".format(
         n_smaller_count, min_counts))
-    print("Calculating matrix with {} words.".format(len(words)))
-    matrix = np.eye(len(words))
-    for i, word in enumerate(words):
-      matrix[i, i:] = model.distances(word, words[i:])
+    return words
 
-    return cls(words, matrix)
+  def missing_words(self, words: Iterable[str]) -> List[str]:
+    """Words that do not have a row in the matrix."""
+    ids = self.word_ids
+    return [word for word in words if word not in ids]
+
+  @property
+  def word_ids(self) -> Dict[str, int]:
+    return {word: i for i, word in enumerate(self.words)}
+
+  def extend(self, model, aspects: collections.Counter, min_counts: int = -1
+             ) -> "DistanceMatrix":
+    """Matrix for updated aspect counts that computes only the new rows.
+
+    Gives the same matrix as `calculate` with the updated `aspects`.
+    Distances between words that are already in the matrix are reused and
+    only the distances of the new words are calculated with the model.
+    """
+    words = self.select_words(model, aspects, min_counts)
+    return self._with_words(words, model)
+
+  def reorder(self, aspects: collections.Counter, min_counts: int = -1
+              ) -> "DistanceMatrix":
+    """Matrix of the same words ordered by updated aspect counts.
+
+    Gives the same matrix as `extend` when the update added no new words.
+    No distance is calculated, so the model is not needed.
+    """
+    words = self.select_words(self.word_ids, aspects, min_counts)
+    return self._with_words(words)
+
+  def _with_words(self, words: List[str], model=None) -> "DistanceMatrix":
+    """Matrix of `words` that calculates only the rows of new words."""
+    ids = self.word_ids
+    old = np.array([i for i, word in enumerate(words) if word in ids],
+                   dtype=np.int64)
+    new = np.array([i for i, word in enumerate(words) if word not in ids],
+                   dtype=np.int64)
+    print("Calculating {} new rows of the matrix with {} words.".format(
+        len(new), len(words)))
+
+    # Reuse old distances from the symmetric version of the old matrix
+    symmetric = np.triu(self.matrix) + np.triu(self.matrix, k=1).T
+    old_ids = [ids[words[i]] for i in old]
+    matrix = np.eye(len(words))
+    matrix[np.ix_(old, old)] = symmetric[np.ix_(old_ids, old_ids)]
+    for i in new:
+      matrix[i] = model.distances(words[i], words)
+      matrix[:, i] = matrix[i]
+    return self.__class__(words, np.triu(matrix))
 
   def save(self, savedir: str):
     with open("_".join([savedir, "words.pkl"]), "wb") as file:
@@ -0,0 +1,71 @@
+"""Finds all outputs of a parsed review in a single walk over its tokens."""
+import collections
+from aspects import array_rules, find_aspects, lexicon
+from spacy import tokens
+from utils import spacy_preprocessing
+from typing import Any, Dict, Sequence
+
+# Available outputs and the DataFrame columns they are saved in
+OUTPUT_COLUMNS = {"aspects": "aspects",
+                  "lemmas": "lemmatized_text",
+                  "host": "host_text"}
+
+
+class DocExtractor:
+  """Fused replacement of `sentiment_aspects`, `lemmatize` and `replace_host`.
+
+  Instead of walking each doc once per output, all requested outputs are
+  collected while visiting each token once. Outputs that are not requested
+  are not calculated at all.
+
+  Host replacement works on the PERSON entity spans found while walking the
+  doc, so unlike `spacy_preprocessing.replace_host` it does not replace other
+  occurrences of the same name that the NER did not tag as PERSON.
+
+  With `rule_engine="arrays"` aspects are found by `array_rules` from the
+  doc arrays, outside the token walk.
+  """
+
+  def __init__(self, outputs: Sequence[str] = ("aspects", "lemmas"),
+               rule_engine: str = "tokens"):
+    if rule_engine not in {"tokens", "arrays"}:
+      raise ValueError("Unknown rule engine {}.".format(rule_engine))
+    for output in outputs:
+      if output not in OUTPUT_COLUMNS:
+        raise ValueError("Unknown extractor output {}. Available outputs "
+                         "are {}.".format(output, list(OUTPUT_COLUMNS)))
+    self.outputs = list(outputs)
+    self.array_rules = rule_engine == "arrays"
+    self.aspects = "aspects" in outputs and not self.array_rules
+    self.lemmas = "lemmas" in outputs
+    self.host = "host" in outputs
+
+  def __call__(self, doc: tokens.Doc) -> Dict[str, Any]:
+    sent_dict = collections.Counter()
+    polarity = lexicon.get_lexicon().polarity
+    lemmas, host_text = [], []
+    for token in doc:
+      if self.aspects:
+        find_aspects.token_aspects(token, sent_dict, polarity)
+      if self.lemmas:
+        lemmas.append(spacy_preprocessing.token_lemma(token))
+      if self.host:
+        if token.ent_type_ != "PERSON":
+          host_text.append(token.text_with_ws)
+        elif token.ent_iob_ == "B" or not host_text:
+          host_text.append("Host" + token.whitespace_)
+        else:
+          # Inside a multi-token name: keep a single "Host" with the
+          # whitespace that follows the last token of the name
+          host_text[-1] = "Host" + token.whitespace_
+
+    results = {}
+    if self.aspects:
+      results["aspects"] = collections.Counter(sent_dict)
+    elif self.array_rules and "aspects" in self.outputs:
+      results["aspects"] = array_rules.doc_aspects(doc)
+    if self.lemmas:
+      results["lemmas"] = spacy_preprocessing.join_lemmas(lemmas)
+    if self.host:
+      results["host"] = "".join(host_text)
+    return results
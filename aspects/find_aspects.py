@@ -1,28 +1,125 @@
 import collections
-import os
 import time
-from spacy import tokens
-from typing import Iterable, List, Set
+from aspects import lexicon
+from spacy import symbols, tokens
+from typing import Dict, Iterable, List
 
+# IDs of the strings that the dependency rules check
+_AMOD = lexicon.string_id("amod")
+_ADVMOD = lexicon.string_id("advmod")
+_NEG = lexicon.string_id("neg")
+_DOBJ = lexicon.string_id("dobj")
+_COMPOUND = lexicon.string_id("compound")
+_AND = lexicon.string_id("and")
 
-def load_words(lexicon_dir: str) -> Set[str]:
-    """Loads opinion word from txt file to set."""
-    file = open(os.path.join(lexicon_dir), encoding="ISO-8859-1")
-    return set(line.strip() for line in file.readlines())
 
-_LEXICON_DIR = "/home/stavros/GitHub/Text-Classification/opinion-lexicon"
-_POS_WORDS = load_words(os.path.join(_LEXICON_DIR, "pos_words.txt"))
-_NEG_WORDS = load_words(os.path.join(_LEXICON_DIR, "neg_words.txt"))
-_OPINION_WORDS = _POS_WORDS | _NEG_WORDS
-
-
-def _is_opinion_mod(token: tokens.Token) -> bool:
+def _is_opinion_mod(token: tokens.Token, polarity: Dict[int, int]) -> bool:
   """Helper method for `sentiment_aspects`."""
-  is_mod = token.dep_ in {"amod", "advmod"}
-  is_op = token.text.lower() in _OPINION_WORDS
+  is_mod = token.dep == _AMOD or token.dep == _ADVMOD
+  is_op = token.lower in polarity
   return is_mod and is_op
 
 
+def has_opinion_words(doc: tokens.Doc) -> bool:
+  """Checks if a doc contains opinion words without requiring parsing.
+
+  Docs without opinion words always have no aspects, so this can be used
+  on tokenized docs to avoid parsing them.
+  """
+  polarity = lexicon.get_lexicon().polarity
+  return any(token.lower in polarity for token in doc)
+
+
+def token_aspects(token: tokens.Token, sent_dict: collections.Counter,
+                  polarity: Dict[int, int]):
+  """Updates `sent_dict` with the aspects that depend on a single token.
+
+  Only opinion words contribute aspects, all other tokens are ignored.
+  Helper method for `doc_aspects` that also allows to find aspects while
+  walking the tokens of a doc for other purposes (see `extractor`).
+
+  Args:
+    token: Token of a parsed doc.
+    sent_dict: Counter with the aspects found so far in the doc.
+    polarity: `polarity` of the opinion lexicon. Callers get it once per
+      doc because this is called for every token.
+  """
+  # check if the word is an opinion word, then assign sentiment
+  sentiment = polarity.get(token.lower)
+  if sentiment is not None:
+    if (token.dep == _ADVMOD):
+      # if target is an adverb modifier (i.e. pretty, highly, etc.)
+      # but happens to be an opinion word, ignore and pass
+      return
+
+    elif (token.dep == _AMOD):
+      sent_dict[token.head.lower_] += sentiment
+
+    else:
+      for child in token.children:
+        # if there's a adj modifier (i.e. very, pretty, etc.) add
+        # more weight to sentiment
+        # This could be better updated for modifiers that either
+        # positively or negatively emphasize
+        if _is_opinion_mod(child, polarity):
+          sentiment *= 1.5
+        # check for negation words and flip the sign of sentiment
+        if child.dep == _NEG:
+          sentiment *= -1
+      for child in token.children:
+        if (token.pos == symbols.VERB) & (child.dep == _DOBJ):
+          # if verb, check if there's a direct object
+          sent_dict[child.lower_] += sentiment
+          # check for conjugates (a AND b), then add both to dictionary
+          subchildren = []
+          conj = 0
+          for subchild in child.children:
+            if subchild.lower == _AND: conj=1
+            if (conj == 1) and (subchild.lower != _AND):
+              subchildren.append(subchild.lower_)
+              conj = 0
+          for subchild in subchildren:
+            sent_dict[subchild] += sentiment
+
+      # check for negation
+      for child in token.head.children:
+        noun = ""
+        if _is_opinion_mod(child, polarity):
+          sentiment *= 1.5
+        if (child.dep == _NEG):
+          # check for negation words and flip the sign of sentiment
+          sentiment *= -1
+
+      # check for nouns
+      for child in token.head.children:
+        noun = ""
+        if (child.pos == symbols.NOUN) and (child.text not in sent_dict):
+          noun = child.lower_
+          # Check for compound nouns
+          for subchild in child.children:
+            if subchild.dep == _COMPOUND:
+              noun = subchild.lower_ + " " + noun
+              sent_dict[noun] += sentiment
+
+
+def doc_aspects(doc: tokens.Doc) -> collections.Counter:
+  """Finds feature words and the corresponding sentiment in a single doc.
+
+  Args:
+    doc: spaCy doc of a review text. Can have more than one sentence,
+      for example can be a full review comment.
+
+  Returns:
+    A counter where keys are the features and the values are the
+      corresponding sentiment scores.
+  """
+  sent_dict = collections.Counter()
+  polarity = lexicon.get_lexicon().polarity
+  for token in doc:
+    token_aspects(token, sent_dict, polarity)
+  return collections.Counter(sent_dict)
+
+
 def sentiment_aspects(docs: Iterable[tokens.Doc]) -> List[collections.Counter]:
   """Finds feature words and the corresponding sentiment.
 
@@ -39,70 +136,9 @@ def sentiment_aspects(docs: Iterable[tokens.Doc]) -> List[collections.Counter]:
     A counter where keys are the features and the values are the
       corresponding sentiment scores.
   """
-  sent_dict_list = []
   start_time = time.time()
-
-  for doc in docs:
-    sent_dict = collections.Counter()
-    for token in doc:
-      # check if the word is an opinion word, then assign sentiment
-      if token.text.lower() in _OPINION_WORDS:
-        sentiment = 1 if token.text.lower() in _POS_WORDS else -1
-        if (token.dep_ == "advmod"):
-          # if target is an adverb modifier (i.e. pretty, highly, etc.)
-          # but happens to be an opinion word, ignore and pass
-          continue
-
-        elif (token.dep_ == "amod"):
-          sent_dict[token.head.text.lower()] += sentiment
-
-        else:
-          for child in token.children:
-            # if there's a adj modifier (i.e. very, pretty, etc.) add
-            # more weight to sentiment
-            # This could be better updated for modifiers that either
-            # positively or negatively emphasize
-            if _is_opinion_mod(child):
-              sentiment *= 1.5
-            # check for negation words and flip the sign of sentiment
-            if child.dep_ == "neg":
-              sentiment *= -1
-          for child in token.children:
-            if (token.pos_ == "VERB") & (child.dep_ == "dobj"):
-              # if verb, check if there's a direct object
-              sent_dict[child.text.lower()] += sentiment
-              # check for conjugates (a AND b), then add both to dictionary
-              subchildren = []
-              conj = 0
-              for subchild in child.children:
-                if subchild.text.lower() == "and": conj=1
-                if (conj == 1) and (subchild.text.lower() != "and"):
-                  subchildren.append(subchild.text.lower())
-                  conj = 0
-              for subchild in subchildren:
-                sent_dict[subchild] += sentiment
-
-          # check for negation
-          for child in token.head.children:
-            noun = ""
-            if _is_opinion_mod(child):
-              sentiment *= 1.5
-            if (child.dep_ == "neg"):
-              # check for negation words and flip the sign of sentiment
-              sentiment *= -1
-
-          # check for nouns
-          for child in token.head.children:
-            noun = ""
-            if (child.pos_ == "NOUN") and (child.text not in sent_dict):
-              noun = child.text.lower()
-              # Check for compound nouns
-              for subchild in child.children:
-                if subchild.dep_ == "compound":
-                  noun = subchild.text.lower() + " " + noun
-                  sent_dict[noun] += sentiment
-    sent_dict_list.append(collections.Counter(sent_dict))
+  sent_dict_list = [doc_aspects(doc) for doc in docs]
 
   print("\nFound aspects on {} reviews.".format(len(sent_dict_list)))
   print(time.time() - start_time)
-  return sent_dict_list
\ No newline at end of file
+  return sent_dict_list
@@ -0,0 +1,77 @@
+"""Opinion lexicon compiled to a polarity index keyed on spaCy string IDs.
+
+spaCy tokens already carry the IDs of their text (`token.orth`) and lower
+case text (`token.lower`), so looking these up in an integer keyed dictionary
+avoids creating a new lower case string for every token.
+"""
+import functools
+import hashlib
+import os
+import numpy as np
+from spacy import strings, symbols
+from utils import directories
+from typing import Set
+
+
+def load_words(lexicon_dir: str) -> Set[str]:
+  """Loads opinion word from txt file to set."""
+  file = open(os.path.join(lexicon_dir), encoding="ISO-8859-1")
+  return set(line.strip() for line in file.readlines())
+
+
+def string_id(text: str) -> int:
+  """ID that spaCy uses for the given string in `token.orth`, `token.dep`, etc.
+
+  Symbol strings (eg. most dependency labels and POS tags) have fixed IDs,
+  every other string is identified by its hash.
+  """
+  return symbols.IDS.get(text, strings.hash_string(text))
+
+
+class OpinionLexicon:
+
+  def __init__(self, pos_words: Set[str], neg_words: Set[str]):
+    self.pos_words = pos_words
+    self.neg_words = neg_words
+    self.words = pos_words | neg_words
+    # Maps the string ID of each opinion word to its polarity (+1 or -1).
+    # Positive polarity is used for the few words that appear in both lists.
+    self.polarity = {string_id(word): -1 for word in neg_words}
+    self.polarity.update({string_id(word): 1 for word in pos_words})
+    # Sorted arrays of the same index for vectorized lookups
+    self.ids = np.array(sorted(self.polarity), dtype=np.uint64)
+    self.polarities = np.array([self.polarity[i] for i in self.ids.tolist()],
+                               dtype=np.int8)
+
+  @classmethod
+  def load(cls, lexicon_dir: str = directories.opinion_lexicon):
+    pos_words = load_words(os.path.join(lexicon_dir, "pos_words.txt"))
+    neg_words = load_words(os.path.join(lexicon_dir, "neg_words.txt"))
+    return cls(pos_words, neg_words)
+
+  @property
+  def checksum(self) -> str:
+    """Hash of the word lists that changes whenever the lexicon changes."""
+    words = ["+{}".format(word) for word in sorted(self.pos_words)]
+    words.extend("-{}".format(word) for word in sorted(self.neg_words))
+    return hashlib.sha1("\n".join(words).encode("utf-8")).hexdigest()
+
+  def polarity_array(self, word_ids: np.ndarray) -> np.ndarray:
+    """Polarity of each word ID in an array, zero for non opinion words."""
+    word_ids = np.asarray(word_ids, dtype=np.uint64)
+    if not len(self.ids):
+      return np.zeros(len(word_ids), dtype=np.int8)
+    ind = np.minimum(np.searchsorted(self.ids, word_ids), len(self.ids) - 1)
+    return np.where(self.ids[ind] == word_ids, self.polarities[ind], 0)
+
+  def __len__(self) -> int:
+    return len(self.words)
+
+  def __contains__(self, word_id: int) -> bool:
+    return word_id in self.polarity
+
+
+@functools.lru_cache(maxsize=None)
+def get_lexicon() -> OpinionLexicon:
+  """Opinion lexicon loaded once per process from `opinion-lexicon`."""
+  return OpinionLexicon.load()
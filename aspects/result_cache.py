@@ -0,0 +1,73 @@
+"""Persistent cache of aspect results keyed by the review text content.
+
+Results are saved in an SQLite file so that they can be shared between runs
+and between areas. Each result is keyed by the hash of the normalized text
+and belongs to a namespace made from the opinion lexicon checksum and the
+rule version (`dependencies.RULES_VERSION`). Results of other namespaces are
+deleted when the cache is opened, so changing the lexicon or the rules
+invalidates the cache automatically.
+"""
+import hashlib
+import pickle
+import sqlite3
+from aspects import lexicon
+from utils import dedup
+from typing import Any, Optional
+
+
+class ResultCache:
+
+  def __init__(self, path: str, rules_version: str, commit_every: int = 1000):
+    """Constructor.
+
+    Args:
+      path: Path of the SQLite file. It is created if it does not exist.
+      rules_version: Version of the rules that produce the results (eg. the
+        hash of their source in `dependencies.RULES_VERSION`).
+      commit_every: Every how many new results to commit to the file.
+    """
+    self.namespace = "{}_{}".format(rules_version,
+                                    lexicon.get_lexicon().checksum)
+    self.commit_every = commit_every
+    self.hits, self.misses, self._uncommitted = 0, 0, 0
+
+    self.connection = sqlite3.connect(path)
+    self.connection.execute("CREATE TABLE IF NOT EXISTS results "
+                            "(key TEXT PRIMARY KEY, namespace TEXT, "
+                            "value BLOB)")
+    deleted = self.connection.execute(
+        "DELETE FROM results WHERE namespace != ?", (self.namespace,)).rowcount
+    self.connection.commit()
+    if deleted > 0:
+      print("Deleted {} cached results of older rules or lexicon.".format(
+          deleted))
+
+  def key(self, text: str) -> str:
+    text = "\n".join([self.namespace, dedup.normalize(text)])
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+  def get(self, text: str) -> Optional[Any]:
+    row = self.connection.execute("SELECT value FROM results WHERE key = ?",
+                                  (self.key(text),)).fetchone()
+    if row is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    return pickle.loads(row[0])
+
+  def put(self, text: str, value: Any):
+    self.connection.execute(
+        "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+        (self.key(text), self.namespace, pickle.dumps(value)))
+    self._uncommitted += 1
+    if self._uncommitted >= self.commit_every:
+      self.commit()
+
+  def commit(self):
+    self.connection.commit()
+    self._uncommitted = 0
+
+  def close(self):
+    self.commit()
+    self.connection.close()
+    print("Result cache: {} hits, {} misses.".format(self.hits, self.misses))
@@ -0,0 +1,70 @@
+"""Compares the vectorized `DataAspects.from_dataframe` with the row loop.
+
+The loop passes every (review, aspect, score) row through
+`containers.create_container`, which is how `from_dataframe` collected the
+aspects before it was vectorized. Both are timed on the same synthetic
+reviews DataFrame and their containers are checked to be identical. Run
+from the repository root:
+  python -m benchmarks.data_aspects --reviews 100000
+"""
+import argparse
+import time
+from aspects import containers
+from benchmarks import synthetic
+from typing import Callable, Tuple
+
+
+def loop(data) -> containers.AspectContainers:
+  rows = ((i, word, score) for i, aspects in enumerate(data["aspects"])
+          for word, score in aspects.items())
+  return containers.create_container(rows, len(data))
+
+
+def vectorized(data) -> containers.AspectContainers:
+  return containers.DataAspects.from_dataframe(data).container
+
+
+def best_time(func: Callable, data, repeats: int
+              ) -> Tuple[float, containers.AspectContainers]:
+  times = []
+  for _ in range(repeats):
+    start_time = time.perf_counter()
+    container = func(data)
+    times.append(time.perf_counter() - start_time)
+  return min(times), container
+
+
+def same_containers(container1: containers.AspectContainers,
+                    container2: containers.AspectContainers) -> bool:
+  if container1.vocabulary != container2.vocabulary:
+    return False
+  arrays = ["score_array", "appearance_array", "rank_array"]
+  if any((getattr(container1, a) != getattr(container2, a)).any()
+         for a in arrays):
+    return False
+  return (container1.review_matrix != container2.review_matrix).nnz == 0
+
+
+def main(reviews: int = 100000, repeats: int = 3):
+  data = synthetic.dataframe(reviews)
+  n_rows = sum(len(aspects) for aspects in data["aspects"])
+  print("{} reviews with {} aspect rows.".format(reviews, n_rows))
+  # Load stopwords before timing
+  containers.english_stopwords()
+
+  loop_time, loop_container = best_time(loop, data, repeats)
+  vec_time, vec_container = best_time(vectorized, data, repeats)
+  print("Loop: {:.4f}s".format(loop_time))
+  print("Vectorized: {:.4f}s".format(vec_time))
+  print("Speed-up: {:.2f}x".format(loop_time / vec_time))
+  print("Identical containers: {}".format(
+      same_containers(loop_container, vec_container)))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--reviews", type=int, default=100000)
+  parser.add_argument("--repeats", type=int, default=3)
+
+  args = parser.parse_args()
+  main(**vars(args))
@@ -0,0 +1,82 @@
+"""Checks the import time of each entry point against a budget.
+
+Every entry point is imported in a fresh interpreter with
+`python -X importtime` and its cumulative import time is compared with its
+budget. Heavy dependencies that an entry point does not need at import time
+are also reported if they are imported. Run from the repository root:
+  python benchmarks/import_time.py
+
+Exits with status 1 if an entry point is over budget or imports a heavy
+dependency eagerly.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Sequence, Tuple
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Budget in seconds and heavy modules that should not be imported
+ENTRY_POINTS = {
+    "show_aspects": (1.0, ["spacy", "nltk", "plotly", "gensim",
+                           "tensorflow"]),
+    "collect_aspects": (1.0, ["spacy", "nltk", "plotly", "gensim",
+                              "tensorflow"]),
+    "find_aspects": (3.0, ["nltk", "plotly", "gensim", "tensorflow"]),
+    "pipeline": (3.0, ["nltk", "plotly", "gensim", "tensorflow"]),
+    "misc.tokenization": (0.5, ["tensorflow"]),
+}
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def import_times(module: str) -> Dict[str, int]:
+  """Cumulative import time in microseconds of every module imported."""
+  process = subprocess.run(
+      [sys.executable, "-X", "importtime", "-c", "import {}".format(module)],
+      cwd=REPO_DIR, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+      universal_newlines=True)
+  if process.returncode != 0:
+    raise ImportError(process.stderr.strip().split("\n")[-1])
+  times = {}
+  for line in process.stderr.split("\n"):
+    match = _LINE.match(line)
+    if match is not None:
+      times[match.group(4)] = int(match.group(2))
+  return times
+
+
+def check(module: str, heavy: Sequence[str]) -> Tuple[float, List[str]]:
+  """Returns the import time of `module` in seconds and eager heavy imports."""
+  times = import_times(module)
+  eager = [name for name in heavy if name in times]
+  return times[module] / 1e6, eager
+
+
+def main(repeats: int = 3) -> int:
+  failed = False
+  for module, (budget, heavy) in ENTRY_POINTS.items():
+    try:
+      # Best of a few runs because the first run also compiles bytecode
+      results = [check(module, heavy) for _ in range(repeats)]
+    except ImportError as error:
+      print("{:<20} skipped ({})".format(module, error))
+      continue
+    seconds = min(seconds for seconds, _ in results)
+    eager = results[-1][1]
+    status = "ok"
+    if seconds > budget or eager:
+      status = "OVER BUDGET" if seconds > budget else "EAGER IMPORTS"
+      failed = True
+    print("{:<20} {:>6.2f}s / {:.2f}s  {}{}".format(
+        module, seconds, budget, status,
+        " ({})".format(", ".join(eager)) if eager else ""))
+  return int(failed)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--repeats", type=int, default=3)
+
+  args = parser.parse_args()
+  sys.exit(main(**vars(args)))
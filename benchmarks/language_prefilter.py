@@ -0,0 +1,97 @@
+"""Benchmark of the tiered english detection against pure `langdetect`.
+
+Reports the agreement of `language_detection.is_english` with and without
+the quick first stage and the speedup of the tiered version. Reviews are
+read from the `comments` column of a reviews CSV if one is given, otherwise
+a small bundled sample of multilingual reviews is repeated:
+  python -m benchmarks.language_prefilter --reviews reviews.csv.gz --n-texts 5000
+"""
+import argparse
+import random
+import time
+import pandas as pd
+from utils import language_detection
+from typing import List, Optional
+
+SAMPLE_REVIEWS = [
+    "The apartment was very clean and the host was really helpful.",
+    "Great location, close to the metro and to many restaurants.",
+    "We had a wonderful stay, everything was exactly as described.",
+    "Nice place, would stay again!",
+    "Perfect!",
+    "The bed was comfortable but the street was a bit noisy at night.",
+    "Maria was a great host, she gave us lots of tips about the city.",
+    "Great location, friendly staff, clean rooms",
+    "Perfect apartment, amazing view, great host",
+    "Excellent location. Spotless room. Friendly helpful staff. Highly recommended!",
+    "Lovely flat, super comfy bed, quiet street.",
+    "Fantastic stay. Awesome views. Would definitely recommend.",
+    "Cozy studio, walking distance to everything.",
+    "Appartement très propre et bien situé, hôte très sympathique.",
+    "Le logement était parfait, merci beaucoup pour votre accueil !",
+    "Sehr schöne Wohnung, gerne wieder. Der Gastgeber war sehr nett.",
+    "Alles war super, die Lage ist perfekt.",
+    "Apartamento muy limpio y muy bien ubicado, lo recomiendo.",
+    "Todo estuvo genial, el anfitrión fue muy amable.",
+    "Casa molto carina e pulita, posizione ottima.",
+    "Appartamento accogliente, torneremo sicuramente.",
+    "Het appartement was schoon en de locatie is top.",
+    "Het was een fijn verblijf, we hebben genoten",
+    "Mieszkanie było czyste i to bardzo ładne",
+    "Wir hatten alles was wir brauchten, also super",
+    "Stan je bio čist i uredan, to je to",
+    "Was für ein schöner Aufenthalt, wir kommen gerne wieder.",
+    "Vi hade det jättebra, lägenheten är fin och ligger bra till.",
+    "Byt byl čistý a to je za mě vše, doporučuji.",
+    "Все было отлично, квартира чистая и уютная.",
+    "房间很干净，位置很方便，房东很热情。",
+    "とても綺麗な部屋でした。また泊まりたいです。",
+    "숙소가 깨끗하고 위치가 좋았어요.",
+    "Το διαμέρισμα ήταν πολύ καθαρό και ο οικοδεσπότης ευγενικός.",
+    "Ok",
+    ":)",
+    "The reservation was canceled 2 days before arrival. This is an automated posting.",
+]
+
+
+def load_texts(reviews: Optional[str], n_texts: int, seed: int = 0
+               ) -> List[str]:
+  rng = random.Random(seed)
+  if reviews is None:
+    return [rng.choice(SAMPLE_REVIEWS) for _ in range(n_texts)]
+  comments = pd.read_csv(reviews, usecols=["comments"]).comments.dropna()
+  comments = comments.astype(str).tolist()
+  rng.shuffle(comments)
+  return comments[:n_texts]
+
+
+def main(reviews: Optional[str] = None, n_texts: int = 2000):
+  texts = load_texts(reviews, n_texts)
+  print("Benchmarking english detection on {} texts.".format(len(texts)))
+
+  results, times = {}, {}
+  for tiered in [False, True]:
+    start_time = time.perf_counter()
+    results[tiered] = [language_detection.is_english(text, tiered)
+                       for text in texts]
+    times[tiered] = time.perf_counter() - start_time
+    print("tiered={}: {:.2f} ms per text".format(
+        tiered, 1e3 * times[tiered] / len(texts)))
+
+  decided = sum(language_detection.quick_is_english(text) is not None
+                for text in texts)
+  agreement = sum(x == y for x, y in zip(results[False], results[True]))
+  print("Decided by the quick stage: {:.1f}%".format(
+      100 * decided / len(texts)))
+  print("Agreement with langdetect: {:.2f}%".format(
+      100 * agreement / len(texts)))
+  print("Speedup: {:.2f}x".format(times[False] / times[True]))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--reviews", type=str, default=None)
+  parser.add_argument("--n-texts", type=int, default=2000)
+
+  args = parser.parse_args()
+  main(**vars(args))
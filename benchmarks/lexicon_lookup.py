@@ -0,0 +1,83 @@
+"""Micro-benchmark of the opinion word lookup done for every token.
+
+Compares the string lookups that the dependency rules used before
+(`token.text.lower()` in Python sets of words) with the integer lookups in
+the ID keyed polarity index of `aspects.lexicon`.
+
+Only the tokenizer is needed, so this runs with a blank English pipeline:
+  python -m benchmarks.lexicon_lookup --n-texts 2000
+"""
+import argparse
+import random
+import time
+import spacy
+from aspects import lexicon
+from typing import List
+
+_FILLER = ["the", "room", "was", "and", "staff", "location", "breakfast",
+           "we", "stayed", "for", "three", "nights", "very", "not", "bed"]
+
+
+def synthetic_texts(words: List[str], n_texts: int, length: int = 60,
+                    seed: int = 0) -> List[str]:
+  """Random texts where roughly one in ten tokens is an opinion word."""
+  rng = random.Random(seed)
+  texts = []
+  for _ in range(n_texts):
+    text = [rng.choice(words) if rng.random() < 0.1 else rng.choice(_FILLER)
+            for _ in range(length)]
+    texts.append(" ".join(text))
+  return texts
+
+
+def string_lookup(docs, opinion_lexicon: lexicon.OpinionLexicon) -> int:
+  n_found = 0
+  for doc in docs:
+    for token in doc:
+      if token.text.lower() in opinion_lexicon.words:
+        sentiment = 1 if token.text.lower() in opinion_lexicon.pos_words else -1
+        n_found += sentiment
+  return n_found
+
+
+def id_lookup(docs, opinion_lexicon: lexicon.OpinionLexicon) -> int:
+  n_found = 0
+  polarity = opinion_lexicon.polarity
+  for doc in docs:
+    for token in doc:
+      sentiment = polarity.get(token.lower)
+      if sentiment is not None:
+        n_found += sentiment
+  return n_found
+
+
+def main(n_texts: int = 2000, repeats: int = 5):
+  opinion_lexicon = lexicon.get_lexicon()
+  nlp = spacy.blank("en")
+  words = sorted(opinion_lexicon.words)
+  docs = list(nlp.pipe(synthetic_texts(words, n_texts)))
+  n_tokens = sum(len(doc) for doc in docs)
+  print("Benchmarking lookups on {} tokens.".format(n_tokens))
+
+  results = {}
+  for name, lookup in [("string", string_lookup), ("id", id_lookup)]:
+    times = []
+    for _ in range(repeats):
+      start_time = time.perf_counter()
+      results[name] = lookup(docs, opinion_lexicon)
+      times.append(time.perf_counter() - start_time)
+    per_token = 1e9 * min(times) / n_tokens
+    print("{}: {:.1f} ns per token".format(name, per_token))
+    results["{}_time".format(name)] = per_token
+
+  assert results["string"] == results["id"]
+  print("Speedup: {:.2f}x".format(results["string_time"] / results["id_time"]))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--n-texts", type=int, default=2000)
+  parser.add_argument("--repeats", type=int, default=5)
+
+  args = parser.parse_args()
+  main(**vars(args))
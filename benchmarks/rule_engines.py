@@ -0,0 +1,94 @@
+"""Checks that the three implementations of the aspect rules agree.
+
+The dependency rules exist as token based rules in `find_aspects` and
+`dependencies.feature_sentiment` and as array rules in `array_rules`. All are
+applied on the same randomly generated parse trees and their Counters are
+compared, including the order of the keys and the type of the values. No
+spaCy model is needed because the trees are built directly as docs. Run
+from the repository root:
+  python -m benchmarks.rule_engines --n-docs 20000
+
+Exits with status 1 if any doc gives different aspects.
+"""
+import argparse
+import collections
+import random
+import sys
+import spacy
+from spacy import tokens
+from aspects import array_rules, dependencies, find_aspects, lexicon
+from typing import List, Tuple
+
+DEPS = ["amod", "advmod", "neg", "dobj", "compound", "nsubj", "conj", "cc",
+        "det", "prep", "pobj", "acomp"]
+POS = ["NOUN", "VERB", "ADJ", "ADV", "DET", "CCONJ", "PROPN", "ADP"]
+WORDS = ["room", "staff", "bed", "location", "view", "host", "breakfast",
+         "pool", "and", "not", "the", "was", "very", "really", "we"]
+
+
+def random_doc(vocab, rng: random.Random, opinion_words: List[str],
+               max_length: int = 15) -> tokens.Doc:
+  """Doc with random words, tags, dependency labels and tree structure."""
+  n = rng.randint(1, max_length)
+  words = [rng.choice(opinion_words) if rng.random() < 0.35
+           else rng.choice(WORDS) for _ in range(n)]
+  words = [word.capitalize() if rng.random() < 0.1 else word
+           for word in words]
+  # Attach every token to a token that is already in the tree
+  order = list(range(n))
+  rng.shuffle(order)
+  heads = list(range(n))
+  for k, i in enumerate(order[1:], 1):
+    heads[i] = order[rng.randrange(k)]
+  deps = [rng.choice(DEPS) for _ in range(n)]
+  deps[order[0]] = "ROOT"
+  pos = [rng.choice(POS) for _ in range(n)]
+  return tokens.Doc(vocab, words=words, heads=heads, deps=deps, pos=pos)
+
+
+def token_feature_sentiment(doc: tokens.Doc) -> collections.Counter:
+  """`dependencies.feature_sentiment` on a doc that is already parsed."""
+  parse = dependencies._parse
+  dependencies._parse = lambda sentence: sentence
+  try:
+    return dependencies.feature_sentiment(doc)
+  finally:
+    dependencies._parse = parse
+
+
+def signature(counter: collections.Counter) -> List[Tuple[str, type, float]]:
+  return [(key, type(value), value) for key, value in counter.items()]
+
+
+def main(n_docs: int = 20000, seed: int = 0, max_length: int = 15) -> int:
+  vocab = spacy.blank("en").vocab
+  opinion_words = sorted(lexicon.get_lexicon().words)
+  rng = random.Random(seed)
+  opinion_words = rng.sample(opinion_words, 30)
+
+  mismatches = collections.Counter()
+  for _ in range(n_docs):
+    doc = random_doc(vocab, rng, opinion_words, max_length)
+    compound = signature(find_aspects.doc_aspects(doc))
+    if signature(array_rules.doc_aspects(doc, compound_only=True)) != compound:
+      mismatches["find_aspects vs array_rules"] += 1
+    nouns = signature(token_feature_sentiment(doc))
+    if signature(array_rules.doc_aspects(doc, compound_only=False)) != nouns:
+      mismatches["dependencies vs array_rules"] += 1
+
+  print("Compared the rules on {} random parse trees.".format(n_docs))
+  for pair, count in mismatches.items():
+    print("{}: {} docs with different aspects".format(pair, count))
+  if not mismatches:
+    print("All rule implementations agree.")
+  return int(bool(mismatches))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--n-docs", type=int, default=20000)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--max-length", type=int, default=15)
+
+  args = parser.parse_args()
+  sys.exit(main(**vars(args)))
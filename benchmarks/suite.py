@@ -0,0 +1,230 @@
+"""Benchmark suite of the hot paths on a synthetic review corpus.
+
+Every benchmark prepares its inputs from `benchmarks.synthetic` for each
+corpus size and times only the call of the function under test (best of
+`--repeats` runs after a warm-up call). Benchmarks whose dependencies (eg.
+the spaCy model, NLTK stopwords or TensorFlow) are not available are
+reported as skipped.
+
+Run from the repository root, once to store a baseline and then after
+changes to compare with it:
+  python -m benchmarks.suite --sizes 100 1000 --output baseline.json
+  python -m benchmarks.suite --sizes 100 1000 --baseline baseline.json
+
+With `--baseline` the results are compared with a previous results file and
+the script exits with status 1 if any benchmark became slower than the
+baseline by more than `--tolerance`.
+"""
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from benchmarks import synthetic
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+def _parsed_docs(texts: List[str]):
+  from utils import spacy_preprocessing
+  nlp = spacy_preprocessing.load_nlp(["tagger", "parser"])
+  disable = spacy_preprocessing.unused_components(nlp, ["tagger", "parser"])
+  return list(nlp.pipe(texts, disable=disable))
+
+
+def sentiment_aspects(size: int):
+  from aspects import find_aspects
+  docs = _parsed_docs(synthetic.reviews(size))
+  return lambda: find_aspects.sentiment_aspects(docs), size
+
+
+def feature_sentiment(size: int):
+  from aspects import dependencies
+  texts = synthetic.reviews(size)
+  dependencies.feature_sentiment(texts[0])
+  return lambda: [dependencies.feature_sentiment(text) for text in texts], size
+
+
+def data_aspects(size: int):
+  from aspects import containers
+  data = synthetic.dataframe(size)
+  return lambda: containers.DataAspects.from_dataframe(data), size
+
+
+def merged_containers(size: int):
+  from aspects import containers
+  container = containers.DataAspects.from_dataframe(
+      synthetic.dataframe(size)).container
+  # Merge about a third of the words to more common words
+  rng = random.Random(0)
+  words = [word for word, _ in container.appearances.most_common()]
+  word_map = {word: rng.choice(words[:i]) for i, word in enumerate(words)
+              if i > 0 and rng.random() < 0.3}
+  return lambda: containers.MergedAspectContainers.create(
+      word_map, container), size
+
+
+def distance_matrix(size: int):
+  from aspects import distance_matrix
+  # Number of reviews that mention each aspect, like `container.appearances`
+  appearances = collections.Counter()
+  for aspects in synthetic.aspects(size):
+    appearances.update(aspects.keys())
+  model = synthetic.FakeEmbeddings(list(appearances))
+  return (lambda: distance_matrix.DistanceMatrix.calculate(model, appearances),
+          len(appearances))
+
+
+def corpus_normalizer(size: int):
+  from utils import preprocessing
+  normalizer = preprocessing.CorpusNormalizer(special_char_removal=True,
+                                              remove_digits=True)
+  texts = synthetic.reviews(size)
+  return lambda: normalizer(texts), size
+
+
+def expand_contractions(size: int):
+  from utils import basic_preprocessing
+  texts = synthetic.reviews(size)
+  return lambda: [basic_preprocessing.expand_contractions(text)
+                  for text in texts], size
+
+
+def full_tokenizer(size: int):
+  from misc import tokenization
+  texts = synthetic.reviews(size)
+  words = sorted({word.strip(".,!'").lower()
+                  for text in texts for word in text.split()})
+  vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", ".", ",", "!", "'", "##s",
+           "##t", "##ve", "##d"] + words
+  vocab_file = os.path.join(tempfile.mkdtemp(), "vocab.txt")
+  with open(vocab_file, "w") as file:
+    file.write("\n".join(vocab))
+  tokenizer = tokenization.FullTokenizer(vocab_file, do_lower_case=True)
+  return lambda: [tokenizer.tokenize(text) for text in texts], size
+
+
+# Each setup function takes the corpus size and returns the function to time
+# and the number of items that it processes
+BENCHMARKS = {
+    "sentiment_aspects": sentiment_aspects,
+    "feature_sentiment": feature_sentiment,
+    "data_aspects_from_dataframe": data_aspects,
+    "merged_containers_create": merged_containers,
+    "distance_matrix_calculate": distance_matrix,
+    "corpus_normalizer": corpus_normalizer,
+    "expand_contractions": expand_contractions,
+    "full_tokenizer": full_tokenizer,
+}
+
+
+def time_call(func: Callable[[], Any], repeats: int) -> float:
+  """Best wall time of `repeats` calls with the output of `func` muted."""
+  times = []
+  for _ in range(repeats):
+    with contextlib.redirect_stdout(io.StringIO()):
+      start_time = time.perf_counter()
+      func()
+      times.append(time.perf_counter() - start_time)
+  return min(times)
+
+
+def run(names: Sequence[str], sizes: Sequence[int], repeats: int = 3
+        ) -> Dict[str, Dict[str, Any]]:
+  """Runs benchmarks and returns `{name: {size: result}}`."""
+  results = {}
+  for name in names:
+    results[name] = {}
+    for size in sizes:
+      try:
+        with contextlib.redirect_stdout(io.StringIO()):
+          func, n_items = BENCHMARKS[name](size)
+          # Warm-up call, which also loads data that is loaded on first use
+          # (eg. NLTK stopwords) so that missing data is reported as skipped
+          func()
+      except (ImportError, OSError, LookupError) as error:
+        # Missing optional dependency, model or data
+        lines = [line.strip() for line in str(error).split("\n")
+                 if any(char.isalnum() for char in line)]
+        reason = "{}: {}".format(type(error).__name__,
+                                 lines[0] if lines else "")
+        results[name][str(size)] = {"skipped": reason}
+        print("{:<28} {:>8} skipped ({})".format(name, size, reason))
+        continue
+
+      seconds = time_call(func, repeats)
+      results[name][str(size)] = {
+          "seconds": seconds, "n_items": n_items,
+          "items_per_sec": n_items / seconds if seconds > 0 else None}
+      print("{:<28} {:>8} {:>10.4f}s {:>12.1f} items/s".format(
+          name, size, seconds, n_items / max(seconds, 1e-12)))
+  return results
+
+
+def compare(results: Dict[str, Dict[str, Any]],
+            baseline: Dict[str, Dict[str, Any]],
+            tolerance: float = 0.2) -> List[str]:
+  """Benchmarks that are slower than the baseline by more than `tolerance`."""
+  regressions = []
+  for name, sizes in results.items():
+    for size, result in sizes.items():
+      base = baseline.get(name, {}).get(size, {})
+      if "seconds" not in result or "seconds" not in base:
+        continue
+      ratio = result["seconds"] / base["seconds"]
+      status = "REGRESSION" if ratio > 1 + tolerance else "ok"
+      print("{:<28} {:>8} {:>8.2f}x baseline time  {}".format(
+          name, size, ratio, status))
+      if status != "ok":
+        regressions.append("{} ({} items)".format(name, size))
+  return regressions
+
+
+def main(sizes: Sequence[int] = (100, 1000), repeats: int = 3,
+         only: Optional[Sequence[str]] = None,
+         output: Optional[str] = None,
+         baseline: Optional[str] = None,
+         tolerance: float = 0.2) -> int:
+  names = list(BENCHMARKS) if not only else list(only)
+  results = run(names, sizes, repeats)
+
+  if output is not None:
+    report = {"python": platform.python_version(),
+              "platform": platform.platform(),
+              "repeats": repeats,
+              "results": results}
+    with open(output, "w") as file:
+      json.dump(report, file, indent=2)
+    print("\nSaved results to {}.".format(output))
+
+  if baseline is not None:
+    with open(baseline, "r") as file:
+      baseline_results = json.load(file)["results"]
+    print("\nComparison with {}:".format(baseline))
+    regressions = compare(results, baseline_results, tolerance)
+    if regressions:
+      print("\nSlower than baseline: {}".format(", ".join(regressions)))
+      return 1
+  return 0
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+  parser.add_argument("--repeats", type=int, default=3)
+  parser.add_argument("--only", type=str, nargs="+", default=None,
+                      choices=list(BENCHMARKS))
+  parser.add_argument("--output", type=str, default=None,
+                      help="Path to save the results as JSON.")
+  parser.add_argument("--baseline", type=str, default=None,
+                      help="Results JSON of a previous run to compare with.")
+  parser.add_argument("--tolerance", type=float, default=0.2,
+                      help="Allowed relative slowdown against the baseline.")
+
+  args = parser.parse_args()
+  sys.exit(main(**vars(args)))
@@ -0,0 +1,120 @@
+"""Deterministic synthetic hotel reviews for the benchmarks.
+
+Reviews are generated from templates that mix aspects with opinion words of
+the lexicon, negations, adverb modifiers and contractions, so that every
+step of the pipeline has work to do. The same `seed` always gives the same
+corpus.
+"""
+import collections
+import random
+import zlib
+import numpy as np
+import pandas as pd
+from typing import List, Sequence
+
+BASE_ASPECTS = ["room", "bed", "staff", "location", "breakfast", "pool",
+                "bathroom", "shower", "view", "wifi", "parking", "beach",
+                "restaurant", "bar", "reception", "price", "service", "food",
+                "balcony", "kitchen", "host", "neighborhood", "street",
+                "apartment", "towels", "air conditioning", "coffee machine"]
+POSITIVE = ["great", "clean", "friendly", "amazing", "comfortable", "helpful",
+            "beautiful", "perfect", "nice", "quiet", "spacious", "excellent"]
+NEGATIVE = ["dirty", "rude", "noisy", "small", "terrible", "bad", "slow",
+            "broken", "uncomfortable", "expensive", "awful", "poor"]
+ADVERBS = ["very", "really", "extremely", "incredibly", "quite"]
+TEMPLATES = [
+    "The {aspect} was {adverb} {opinion}.",
+    "We loved the {opinion} {aspect}!",
+    "I didn't like the {aspect}, it's {opinion}.",
+    "The {aspect} wasn't {opinion} at all.",
+    "They've got a {opinion} {aspect} and we'd come back.",
+    "{Host} was {opinion} and the {aspect} is {adverb} {opinion}.",
+    "Can't complain about the {aspect}, it was {opinion}.",
+    "The {aspect} and the {aspect2} were {opinion}.",
+]
+HOSTS = ["Maria", "John", "Nikos", "Anna", "Peter"]
+
+
+def vocabulary(n_aspects: int) -> List[str]:
+  """Aspect vocabulary with `n_aspects` words made from `BASE_ASPECTS`."""
+  words = list(BASE_ASPECTS)
+  i = 0
+  while len(words) < n_aspects:
+    words.append("{}{}".format(BASE_ASPECTS[i % len(BASE_ASPECTS)],
+                               i // len(BASE_ASPECTS)))
+    i += 1
+  return words[:n_aspects]
+
+
+def _aspect_vocabulary(n_reviews: int) -> List[str]:
+  # Larger corpora mention more distinct aspects like real data
+  return vocabulary(max(len(BASE_ASPECTS), n_reviews // 4))
+
+
+def _zipf_choice(rng: random.Random, words: Sequence[str]) -> str:
+  # Few aspects are very frequent and most are rare
+  return words[min(int(rng.paretovariate(1.0)) - 1, len(words) - 1)]
+
+
+def reviews(n_reviews: int, seed: int = 0, sentences: int = 4) -> List[str]:
+  """Review texts with `sentences` template sentences each."""
+  rng = random.Random(seed)
+  words = _aspect_vocabulary(n_reviews)
+  texts = []
+  for _ in range(n_reviews):
+    text = []
+    for _ in range(sentences):
+      opinion = rng.choice(POSITIVE if rng.random() < 0.7 else NEGATIVE)
+      text.append(rng.choice(TEMPLATES).format(
+          aspect=_zipf_choice(rng, words), aspect2=_zipf_choice(rng, words),
+          opinion=opinion, adverb=rng.choice(ADVERBS),
+          Host=rng.choice(HOSTS)))
+    texts.append(" ".join(text))
+  return texts
+
+
+def aspects(n_reviews: int, seed: int = 0, per_review: int = 4
+            ) -> List[collections.Counter]:
+  """Aspect counters like the ones `find_aspects` saves for each review."""
+  rng = random.Random(seed)
+  words = _aspect_vocabulary(n_reviews)
+  scores = [1, 1, 1, 1.5, 2.25, -1, -1, -1.5]
+  counters = []
+  for _ in range(n_reviews):
+    counter = collections.Counter()
+    for _ in range(rng.randint(0, per_review)):
+      counter[_zipf_choice(rng, words)] += rng.choice(scores)
+    counters.append(counter)
+  return counters
+
+
+def dataframe(n_reviews: int, seed: int = 0) -> pd.DataFrame:
+  """Reviews DataFrame with the columns that `find_aspects` saves."""
+  return pd.DataFrame({"id": np.arange(n_reviews),
+                       "text": reviews(n_reviews, seed),
+                       "aspects": aspects(n_reviews, seed)})
+
+
+class FakeEmbeddings:
+  """Small stand-in for gensim's `KeyedVectors` with random word vectors.
+
+  Implements the part of the `KeyedVectors` interface that
+  `DistanceMatrix.calculate` uses. Vectors depend only on the word and the
+  seed.
+  """
+
+  def __init__(self, words: Sequence[str], dim: int = 50, seed: int = 0):
+    vectors = np.array([
+        np.random.RandomState((zlib.crc32(word.encode()) + seed) % 2 ** 32
+                              ).normal(size=dim)
+        for word in words]).reshape((len(words), dim))
+    self.vectors = vectors / np.linalg.norm(vectors, axis=1)[:, np.newaxis]
+    self.index = {word: i for i, word in enumerate(words)}
+
+  def __contains__(self, word: str) -> bool:
+    return word in self.index
+
+  def distances(self, word: str, other_words: Sequence[str]) -> np.ndarray:
+    """Cosine distances between `word` and each of `other_words`."""
+    ids = [self.index[other] for other in other_words]
+    return 1 - self.vectors[ids].dot(self.vectors[self.index[word]])
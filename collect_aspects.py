@@ -1,20 +1,58 @@
 import os
 import argparse
-from aspects import containers
-from utils import directories
+import pandas as pd
+from aspects import columnar, containers
+from utils import directories, profiling
+from typing import Optional
 
 
-def main(filename: str, skip_merging: bool, n_words: int = 200000):
+def main(filename: str, skip_merging: bool, n_words: int = 200000,
+         update: Optional[str] = None, workers: int = 1,
+         profile: Optional[str] = None, cprofile_dir: Optional[str] = None):
   data_dir = os.path.join(directories.trip_advisor, filename)
-  aspects = containers.DataAspects.from_pkl(data_dir)
+  profiler = profiling.Profiler(cprofile_dir)
+  if update is None:
+    with profiler.stage("collect") as record:
+      if columnar.find_path(data_dir) is not None:
+        # Saved by `find_aspects.py --columnar` without an aspects column
+        aspects = containers.DataAspects.from_columnar(data_dir)
+      else:
+        aspects = containers.DataAspects.from_pkl(data_dir, workers=workers)
+      record["n_items"] = len(aspects.data)
+  else:
+    # Add only the new reviews to the saved aspects
+    with profiler.stage("update") as record:
+      aspects = containers.DataAspects.load(data_dir)
+      update_dir = os.path.join(directories.trip_advisor, update)
+      new_data = pd.read_pickle(".".join([update_dir, "pkl"]))
+      new_table = None
+      if columnar.find_path(update_dir) is not None:
+        new_table = columnar.load(update_dir)
+      record["n_items"] = aspects.update(new_data, new_table=new_table)
+      print("Added {} new reviews out of {}.".format(record["n_items"],
+                                                     len(new_data)))
 
+  # After an update only rows of new words are calculated and Word2Vec is
+  # loaded only if there are any. Otherwise the matrix is just reordered.
   if not skip_merging:
-    import gensim
-    word2vec = gensim.models.KeyedVectors.load_word2vec_format(
-        directories.google_word2vec, binary=True, limit=n_words)
-    aspects.create_distance_matrix(word2vec)
+    word2vec = None
+    if update is None or aspects.pending_words:
+      import gensim
+      with profiler.stage("load_word2vec", n_items=n_words):
+        word2vec = gensim.models.KeyedVectors.load_word2vec_format(
+            directories.google_word2vec, binary=True, limit=n_words)
+    with profiler.stage("distance_matrix") as record:
+      if update is None:
+        aspects.create_distance_matrix(word2vec)
+      else:
+        aspects.update_distance_matrix(word2vec)
+      record["n_items"] = len(aspects.matrix)
 
-  aspects.save()
+  with profiler.stage("save"):
+    aspects.save(save_data=update is not None)
+
+  if profile is not None:
+    profiler.save(profile)
 
 
 if __name__ == "__main__":
@@ -22,6 +60,18 @@ if __name__ == "__main__":
   parser.add_argument("--filename", type=str)
   parser.add_argument("--skip-merging", action="store_true")
   parser.add_argument("--n-words", type=int, default=200000)
+  parser.add_argument("--update", type=str, default=None,
+                      help="Filename of new reviews with aspects to add to "
+                           "the saved aspects of `--filename`. Reviews "
+                           "that were already added are skipped.")
+  parser.add_argument("--workers", type=int, default=1,
+                      help="Number of processes that collect the aspects of "
+                           "shards of the reviews.")
+  parser.add_argument("--profile", type=str, default=None,
+                      help="Path of a JSON report with the time and memory "
+                           "of each stage.")
+  parser.add_argument("--cprofile-dir", type=str, default=None,
+                      help="Directory to save cProfile stats of each stage.")
 
   args = parser.parse_args()
   main(**vars(args))
\ No newline at end of file
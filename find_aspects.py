@@ -1,18 +1,21 @@
+import functools
 import os
 import argparse
+import numpy as np
 import pandas as pd
-from aspects import find_aspects
+from aspects import array_rules, columnar, extractor, find_aspects
 from utils import directories
-from utils import basic_preprocessing, spacy_preprocessing
+from utils import basic_preprocessing, ingestion, parallel, profiling
+from utils import spacy_preprocessing
+from utils import dedup as dedup_texts
+from typing import Any, Dict, List, Optional, Sequence
 
 
 def load_reviews(hotel_name: str, n_reviews: str) -> pd.DataFrame:
   loadname = "{}_{}reviews.csv".format(hotel_name, n_reviews)
   loadname = os.path.join(directories.trip_advisor, loadname)
 
-  reviews = pd.read_csv(loadname)
-  reviews = reviews[pd.notnull(reviews["text"])]
-  return reviews
+  return ingestion.read_reviews(loadname, text_column="text")
 
 
 def preprocessing(texts: pd.Series):
@@ -22,64 +25,196 @@ def preprocessing(texts: pd.Series):
   return texts
 
 
+def extract_aspects(texts: List[str],
+                    outputs: Sequence[str] = ("aspects", "lemmas"),
+                    fused: bool = False, stream: bool = False,
+                    batch_size: int = 1000,
+                    prefilter: bool = False,
+                    doc_cache: Optional[str] = None,
+                    doc_cache_size: float = 1024,
+                    rule_engine: str = "tokens") -> List[Dict[str, Any]]:
+  """Finds aspects, lemmatized text and host replaced text of the given texts.
+
+  This is what `main` does in a single process and is also used as the
+  worker function when `main` runs with more than one worker.
+
+  Args:
+    texts: Review texts to process.
+    outputs: Which outputs to calculate for each text. See
+      `extractor.OUTPUT_COLUMNS` for the available options.
+    fused: If True all outputs are found in a single walk over each doc
+      using `extractor.DocExtractor`.
+    stream: If True docs are generated lazily in batches of `batch_size`
+      and each doc is released after all outputs are found, instead
+      of keeping the docs of all texts in memory.
+    batch_size: Batch size for `nlp.pipe` when streaming.
+    prefilter: If True reviews without opinion words, that cannot have
+      aspects, are only tokenized and are not parsed.
+    doc_cache: Directory of an on-disk cache of parsed docs. If given, only
+      texts that are not found in the cache are parsed.
+    doc_cache_size: Maximum size of the doc cache in MB.
+    rule_engine: "tokens" to evaluate the aspect rules on spaCy tokens or
+      "arrays" to evaluate them on doc arrays with `array_rules`.
+
+  Returns:
+    A dictionary for each text that maps each output to its value.
+  """
+  # Apply only the spacy components that the requested outputs need
+  spacy_kwargs = {"components": spacy_preprocessing.components_for(outputs),
+                  "cache_dir": doc_cache, "cache_size_mb": doc_cache_size}
+  if prefilter:
+    spacy_kwargs["needs_parse"] = find_aspects.has_opinion_words
+    # Reviews without opinion words skip the components that are required
+    # only for aspects
+    other_components = spacy_preprocessing.components_for(
+        output for output in outputs if output != "aspects")
+    spacy_kwargs["skip_components"] = [
+        name for name in spacy_kwargs["components"]
+        if name not in other_components]
+
+  if stream:
+    spacy_docs = spacy_preprocessing.iter_spacy(
+        texts, batch_size=batch_size, **spacy_kwargs)
+  else:
+    # Create spacy docs using `nlp.pipe`
+    spacy_docs = spacy_preprocessing.apply_spacy(texts, **spacy_kwargs)
+
+  if fused:
+    doc_extractor = extractor.DocExtractor(outputs, rule_engine=rule_engine)
+    return spacy_preprocessing.consume_docs(spacy_docs, [doc_extractor])[0]
+
+  rules = {"tokens": find_aspects, "arrays": array_rules}[rule_engine]
+  if stream:
+    consumers = {"aspects": rules.doc_aspects,
+                 "lemmas": spacy_preprocessing.lemmatize_doc,
+                 "host": spacy_preprocessing.replace_host_doc}
+    results = spacy_preprocessing.consume_docs(
+        spacy_docs, [consumers[output] for output in outputs])
+  else:
+    functions = {"aspects": rules.sentiment_aspects,
+                 "lemmas": spacy_preprocessing.lemmatize,
+                 "host": spacy_preprocessing.replace_host}
+    results = [functions[output](spacy_docs) for output in outputs]
+  return [dict(zip(outputs, values)) for values in zip(*results)]
+
+
 def main(hotel_name: str, n_reviews: int,
          skip_language_check: bool = False,
          apply_basic_preprocessing: bool = False,
-         use_neuralcoref: bool = False):
+         use_neuralcoref: bool = False,
+         workers: int = 1,
+         outputs: Sequence[str] = ("aspects", "lemmas"),
+         fused: bool = False,
+         stream: bool = False,
+         batch_size: int = 1000,
+         prefilter: bool = False,
+         doc_cache: Optional[str] = None,
+         doc_cache_size: float = 1024,
+         rule_engine: str = "tokens",
+         dedup: bool = False,
+         savename: Optional[str] = None,
+         profile: Optional[str] = None,
+         cprofile_dir: Optional[str] = None,
+         columnar_output: bool = False):
   # List that keeps track which preprocessing options where used so that
   # we log them in the saved pickle title
   # Log the number of reviews right before saving because this changes as
   # some reviews are not valid
+  given_savename = savename
   savename = [hotel_name, "{}reviews", "withaspects"]
 
-  reviews = load_reviews(hotel_name, n_reviews)
+  profiler = profiling.Profiler(cprofile_dir)
+  with profiler.stage("load") as record:
+    reviews = load_reviews(hotel_name, n_reviews)
+    record["n_items"] = len(reviews)
   n_reviews = len(reviews)
   print("Loaded {} reviews from {}".format(n_reviews, hotel_name))
 
-  if skip_language_check:
-    # Keep reviews with more than 2 characters
-    valid_reviews = reviews[reviews.text.map(lambda x: len(x)) > 2]
-    print("Kept {} reviews with more than 2 characters.".format(
-        len(valid_reviews)))
-  else:
-    valid_reviews = reviews[reviews.text.map(basic_preprocessing.is_english)]
-    print("Kept {} english reviews.".format(len(valid_reviews)))
+  with profiler.stage("dedup", n_items=len(reviews)):
+    if dedup:
+      # Process each unique text once and copy results to all its reviews
+      texts, codes = dedup_texts.unique_texts(reviews.text)
+    else:
+      texts, codes = reviews.text, np.arange(len(reviews))
+
+  with profiler.stage("language", n_items=len(texts)):
+    if skip_language_check:
+      # Keep reviews with more than 2 characters
+      is_valid = texts.map(lambda x: len(x)).values > 2
+      valid_reviews = reviews[is_valid[codes]]
+      print("Kept {} reviews with more than 2 characters.".format(
+          len(valid_reviews)))
+    else:
+      is_valid = np.array(basic_preprocessing.are_english(texts, workers),
+                          dtype=bool)
+      valid_reviews = reviews[is_valid[codes]]
+      print("Kept {} english reviews.".format(len(valid_reviews)))
 
   n_reviews = len(valid_reviews)
-  texts = valid_reviews.text
+  texts = texts[is_valid]
+  # Position of each valid review's text in `texts`
+  codes = (np.cumsum(is_valid) - 1)[codes[is_valid[codes]]]
 
   # Basic preprocessing
   if apply_basic_preprocessing:
     savename.append("basicproc")
-    texts = preprocessing(valid_reviews.text)
+    with profiler.stage("basic_preprocessing", n_items=len(texts)):
+      texts = preprocessing(texts)
 
   # Use neuralcoref
-  # TODO: Think of a way to run spacy once for both coref, host name
-  # substitution and aspect identification
+  # Host name substitution and aspect identification can share a single
+  # walk over the docs with `--fused`, but coref needs its own pass because
+  # aspects are found on the resolved text
   if use_neuralcoref:
     savename.append("coref")
-    texts = spacy_preprocessing.apply_neuralcoref(texts)
-
-  # Create spacy docs using `nlp.pipe`
-  spacy_docs = spacy_preprocessing.apply_spacy(texts)
-  # Use docs to find aspects
-  aspects = find_aspects.sentiment_aspects(spacy_docs)
-  # Lemmatize text after finding aspects
-  lemmatized_texts = spacy_preprocessing.lemmatize(spacy_docs)
-
-  # Add columns to the DataFrame
-  pd.options.mode.chained_assignment = None
-  valid_reviews["processed_text"] = texts
-  valid_reviews["aspects"] = aspects
-  valid_reviews["lemmatized_text"] = lemmatized_texts
-
-  # Save to pickle
-  savename = "_".join(savename).format(n_reviews)
-  valid_reviews.to_pickle("{}.pkl".format(
-      os.path.join(directories.trip_advisor, savename)))
+    with profiler.stage("neuralcoref", n_items=len(texts)):
+      texts = spacy_preprocessing.apply_neuralcoref(texts)
+
+  extract = functools.partial(extract_aspects, outputs=outputs, fused=fused,
+                              stream=stream, batch_size=batch_size,
+                              prefilter=prefilter, doc_cache=doc_cache,
+                              doc_cache_size=doc_cache_size,
+                              rule_engine=rule_engine)
+  with profiler.stage("extract", n_items=len(texts)):
+    if workers > 1:
+      # Each worker parses a shard of the reviews and results are merged
+      # back in the original order
+      results = parallel.map_shards(extract, list(texts), workers)
+    else:
+      results = extract(texts)
+
+  with profiler.stage("save", n_items=n_reviews):
+    # Add columns to the DataFrame
+    pd.options.mode.chained_assignment = None
+    valid_reviews["processed_text"] = dedup_texts.fan_out(list(texts), codes)
+    results = dedup_texts.fan_out(results, codes)
+    for output in outputs:
+      valid_reviews[extractor.OUTPUT_COLUMNS[output]] = [
+          result[output] for result in results]
+
+    # Save to pickle
+    if given_savename is None:
+      savename = "_".join(savename).format(n_reviews)
+    else:
+      savename = given_savename
+    save_prefix = os.path.join(directories.trip_advisor, savename)
+    if columnar_output and "aspects" in outputs:
+      # Aspects are saved as a long table and not as Counters in the pickle
+      table = columnar.to_table(valid_reviews["aspects"], valid_reviews.index)
+      columnar.save(table, save_prefix)
+      valid_reviews.drop(columns=["aspects"]).to_pickle(
+          "{}.pkl".format(save_prefix))
+    else:
+      valid_reviews.to_pickle("{}.pkl".format(save_prefix))
+      # A table of an older columnar run would be used instead of the pickle
+      old_table = columnar.find_path(save_prefix)
+      if old_table is not None:
+        os.remove(old_table)
   print("\nSaved DataFrame with shape {} to {}.".format(
       valid_reviews.shape, savename))
 
+  if profile is not None:
+    profiler.save(profile)
   return valid_reviews
 
 
@@ -90,6 +225,27 @@ if __name__ == "__main__":
   parser.add_argument("--skip-language-check", action="store_true")
   parser.add_argument("--apply-basic-preprocessing", action="store_true")
   parser.add_argument("--use-neuralcoref", action="store_true")
+  parser.add_argument("--workers", type=int, default=1)
+  parser.add_argument("--outputs", type=str, nargs="+",
+                      default=["aspects", "lemmas"],
+                      choices=list(extractor.OUTPUT_COLUMNS))
+  parser.add_argument("--fused", action="store_true")
+  parser.add_argument("--stream", action="store_true")
+  parser.add_argument("--batch-size", type=int, default=1000)
+  parser.add_argument("--prefilter", action="store_true")
+  parser.add_argument("--doc-cache", type=str, default=None)
+  parser.add_argument("--doc-cache-size", type=float, default=1024)
+  parser.add_argument("--rule-engine", type=str, default="tokens",
+                      choices=["tokens", "arrays"])
+  parser.add_argument("--dedup", action="store_true")
+  parser.add_argument("--columnar", dest="columnar_output", action="store_true",
+                      help="Save aspects as a long (review_id, aspect, score) "
+                           "table instead of Counters in the pickle.")
+  parser.add_argument("--profile", type=str, default=None,
+                      help="Path of a JSON report with the time and memory "
+                           "of each stage.")
+  parser.add_argument("--cprofile-dir", type=str, default=None,
+                      help="Directory to save cProfile stats of each stage.")
   #parser.add_argument("--n-message", type=int, default=200)
 
   args = parser.parse_args()
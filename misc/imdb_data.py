@@ -1,7 +1,6 @@
 import os
 import re
 import pandas as pd
-import tensorflow as tf
 from typing import Tuple
 
 
@@ -28,6 +27,7 @@ def load_dataset(directory: str) -> pd.DataFrame:
 
 def download_and_load_datasets() -> Tuple[pd.DataFrame, pd.DataFrame]:
   """Download and process IMBDb dataset."""
+  import tensorflow as tf
   dataset = tf.keras.utils.get_file(
       fname="aclImdb.tar.gz",
       origin="http://ai.stanford.edu/~amaas/data/sentiment/aclImdb_v1.tar.gz",
@@ -22,7 +22,6 @@ import collections
 import re
 import unicodedata
 import six
-import tensorflow as tf
 
 
 def validate_case_matches_checkpoint(do_lower_case, init_checkpoint):
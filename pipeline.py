@@ -0,0 +1,123 @@
+"""Runs `find_aspects` -> `collect_aspects` -> `show_aspects` as one pipeline.
+
+Each step is a stage from `utils.stages` that is skipped when its outputs
+were already created from the same inputs, so changing only the display or
+merge options does not rerun parsing or the distance matrix calculation.
+
+  python pipeline.py --hotel-name NAME --n-reviews N --cut-off 0.4
+"""
+import argparse
+import os
+import collect_aspects
+import find_aspects
+import show_aspects
+from aspects import dependencies, extractor, lexicon
+from utils import directories, spacy_preprocessing, stages
+from typing import List, Optional, Sequence
+
+# Source files of the aspect rules. Changing any of them reruns find_aspects.
+RULE_FILES = [os.path.join(os.path.dirname(extractor.__file__), filename)
+              for filename in ["find_aspects.py", "array_rules.py",
+                               "extractor.py", "dependencies.py"]]
+
+
+def model_version() -> Optional[str]:
+  """Version of the installed spaCy model without loading the model."""
+  import spacy
+  try:
+    return spacy.util.get_package_version(spacy_preprocessing.MODEL_NAME)
+  except:
+    return None
+
+
+def create_stages(hotel_name: str, n_reviews: int,
+                  skip_language_check: bool = False,
+                  apply_basic_preprocessing: bool = False,
+                  use_neuralcoref: bool = False,
+                  outputs: Sequence[str] = ("aspects", "lemmas"),
+                  skip_merging: bool = False,
+                  n_words: int = 200000,
+                  cut_off: Optional[float] = None,
+                  plot: bool = False,
+                  start: int = 0, end: int = 20,
+                  workers: int = 1) -> List[stages.Stage]:
+  """Creates the stages of the pipeline for a hotel.
+
+  Options that only change how a stage runs (eg. `workers`) and not its
+  results are not part of the stage fingerprint.
+  """
+  filename = "{}_{}reviews_pipeline".format(hotel_name, n_reviews)
+  data_dir = os.path.join(directories.trip_advisor, filename)
+  reviews_file = os.path.join(directories.trip_advisor,
+                              "{}_{}reviews.csv".format(hotel_name, n_reviews))
+
+  find_options = dict(skip_language_check=skip_language_check,
+                      apply_basic_preprocessing=apply_basic_preprocessing,
+                      use_neuralcoref=use_neuralcoref,
+                      outputs=list(outputs))
+  find = stages.Stage(
+      "find_aspects",
+      lambda: find_aspects.main(hotel_name, n_reviews, workers=workers,
+                                savename=filename, **find_options),
+      outputs=["{}.pkl".format(data_dir)],
+      files=[reviews_file] + RULE_FILES,
+      options=dict(find_options,
+                   lexicon=lexicon.get_lexicon().checksum,
+                   rules_version=dependencies.RULES_VERSION,
+                   model=spacy_preprocessing.MODEL_NAME,
+                   model_version=model_version()))
+
+  collect_outputs = ["{}_container.pkl".format(data_dir)]
+  collect_files = []
+  if not skip_merging:
+    collect_outputs.append("{}_matrix.npy".format(data_dir))
+    collect_outputs.append("{}_matrix_words.pkl".format(data_dir))
+    collect_files.append(directories.google_word2vec)
+  collect = stages.Stage(
+      "collect_aspects",
+      lambda: collect_aspects.main(filename, skip_merging, n_words,
+                                   workers=workers),
+      outputs=collect_outputs,
+      files=collect_files,
+      options=dict(skip_merging=skip_merging, n_words=n_words),
+      depends=[find],
+      # the word2vec model is large and does not change
+      hash_content=False)
+
+  show = stages.Stage(
+      "show_aspects",
+      lambda: show_aspects.main(filename, cut_off, plot, start, end),
+      outputs=[], depends=[collect])
+  return [find, collect, show]
+
+
+def main(hotel_name: str, n_reviews: int, force: Sequence[str] = (),
+         **kwargs):
+  pipeline = create_stages(hotel_name, n_reviews, **kwargs)
+  stages.run_stages(pipeline, force=force)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--hotel-name", type=str)
+  parser.add_argument("--n-reviews", type=int)
+  parser.add_argument("--skip-language-check", action="store_true")
+  parser.add_argument("--apply-basic-preprocessing", action="store_true")
+  parser.add_argument("--use-neuralcoref", action="store_true")
+  parser.add_argument("--outputs", type=str, nargs="+",
+                      default=["aspects", "lemmas"],
+                      choices=list(extractor.OUTPUT_COLUMNS))
+  parser.add_argument("--workers", type=int, default=1)
+  parser.add_argument("--skip-merging", action="store_true")
+  parser.add_argument("--n-words", type=int, default=200000)
+  parser.add_argument("--cut-off", type=float, default=None)
+  parser.add_argument("--plot", action="store_true")
+  parser.add_argument("--start", type=int, default=0)
+  parser.add_argument("--end", type=int, default=20)
+  parser.add_argument("--force", type=str, nargs="+", default=[],
+                      choices=["find_aspects", "collect_aspects",
+                               "show_aspects"],
+                      help="Stages to run even if their outputs are valid.")
+
+  args = parser.parse_args()
+  main(**vars(args))
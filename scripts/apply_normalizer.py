@@ -1,13 +1,12 @@
 """Applies text preprocessing and saves the generated `DataFrame`."""
 import argparse
+import concurrent.futures
+import functools
 import os
 import numpy as np
 import pandas as pd
-import langdetect
-from utils import preprocessing
-from typing import Optional
-
-# TODO: Possible parallelization of this
+from utils import ingestion, language_detection, parallel, preprocessing
+from typing import Any, Dict, List, Optional, Sequence
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--area", default="nyc", type=str,
@@ -18,6 +17,13 @@ parser.add_argument("--samples", default=None, type=int,
                     help="Number of samples to use (to make it faster than using all data.")
 parser.add_argument("--message", default=None, type=int,
                     help="Every how many processed texts to print messages.")
+parser.add_argument("--workers", default=1, type=int,
+                    help="Number of processes for language detection and "
+                         "normalization.")
+parser.add_argument("--chunk-size", default=5000, type=int,
+                    help="Number of candidate reviews processed in each chunk.")
+parser.add_argument("--columns", default=None, type=str, nargs="+",
+                    help="Columns to read and save. All columns by default.")
 
 # Note that the following three options are enabled by default for convenience
 #parser.add_argument("--remove-stopwords", action="store_true",
@@ -28,31 +34,75 @@ parser.add_argument("--message", default=None, type=int,
 #                    help="Whether to keep only english reviews.")
 
 
+# Normalizer of each worker process, created once by `_normalize_shard`
+_NORMALIZER = None
+
+
+def candidate_mask(comments: pd.Series) -> pd.Series:
+  """Cheap filters that are applied on all reviews before sampling.
+
+  A review is a candidate if it is a string with more than 5 characters that
+  does not contain the word "canceled" ("canceled" reviews are usually
+  automated postings!).
+  """
+  is_string = comments.map(lambda review: isinstance(review, str))
+  is_long = comments.str.len() > 5
+  canceled = comments.str.contains("canceled", regex=False, na=False)
+  return is_string & is_long & ~canceled
+
+
+def _normalize_shard(texts: Sequence[str], english_only: bool,
+                     normalizer_kwargs: Dict[str, Any]) -> List[Optional[str]]:
+  """Normalizes the english texts of a shard.
+
+  Returns `None` for texts that are not in english or that `langdetect`
+  fails on.
+  """
+  global _NORMALIZER
+  if _NORMALIZER is None:
+    _NORMALIZER = preprocessing.CorpusNormalizer(**normalizer_kwargs)
+
+  results = []
+  for text in texts:
+    if english_only and language_detection.detect(text) != "en":
+      results.append(None)
+      continue
+    results.append(_NORMALIZER([text])[0])
+  return results
+
+
 def main(data_dir: str, area: str,
          samples: Optional[int] = None,
          remove_stopwords: bool = True,
          lemmatize: bool = True,
          english_only: bool = True,
-         message: Optional[int] = None):
+         message: Optional[int] = None,
+         workers: int = 1,
+         chunk_size: int = 5000,
+         columns: Optional[List[str]] = None):
   # Load reviews for the given area
   area_dir = os.path.join(data_dir, area)
-  data = pd.read_csv(os.path.join(area_dir, "reviews.csv.gz"))
+  # Remove lines for which reviews are nan, too short or canceled while
+  # reading the file in chunks
+  clean_data = ingestion.read_reviews(
+      os.path.join(area_dir, "reviews.csv.gz"), columns=columns,
+      row_filter=lambda chunk: candidate_mask(chunk.comments))
   print("Loaded {} reviews.".format(area))
-  # Remove lines for which reviews are nan
-  clean_data = data[pd.notnull(data.comments)]
-  print("Number of not-NaN reviews: {}".format(len(clean_data)))
+  print("Number of candidate reviews: {}".format(len(clean_data)))
 
   if samples is None or samples > len(clean_data):
     print("Using all reviews.")
     samples = len(clean_data)
 
-
-  normalizer = preprocessing.CorpusNormalizer(special_char_removal=True,
-                                              remove_digits=True,
-                                              text_lemmatization=lemmatize,
-                                              stopword_removal=remove_stopwords)
+  normalizer_kwargs = dict(special_char_removal=True,
+                           remove_digits=True,
+                           text_lemmatization=lemmatize,
+                           stopword_removal=remove_stopwords)
+  # Worker processes that are forked from this one reuse this normalizer
+  global _NORMALIZER
+  _NORMALIZER = preprocessing.CorpusNormalizer(**normalizer_kwargs)
   print("\nText normalizer has the following functionalities:")
-  print(normalizer)
+  print(_NORMALIZER)
 
   if english_only:
     print("\nKeeping reviews in english only.")
@@ -61,47 +111,42 @@ def main(data_dir: str, area: str,
   ids = np.arange(clean_data.shape[0])
   np.random.shuffle(ids)
 
-  # Create new DataFrame to fill with sampled data points
-  sampled_columns = list(clean_data.columns) + ["normalized_comments"]
-  sampled_data = pd.DataFrame(index=range(samples), columns=sampled_columns)
-  # Fill with valid datapoints
-  i, ic = 0, 0
-  while ic < samples:
-    data_row = clean_data.iloc[i]
-    review = data_row["comments"]
-    i += 1
-    # A review is valid if it is a string and has more than 5 characters
-    is_valid = isinstance(review, str) and len(review) > 5
-    if is_valid and english_only:
-      try:
-        is_english = langdetect.detect(data_row["comments"]) == "en"
-      except:
-        print(data_row["comments"])
-        continue
-    else:
-      is_english = True
-
-    # Skip the review if it contains the word "canceled".
-    # "canceled" reviews are usually automated postings!
-    if is_valid and is_english and ("canceled" not in review):
-      sampled_data.iloc[ic] = data_row
-      ic += 1
-
-    if english_only and ic % message == 0:
-      print("{} / {} english reviews found.".format(ic, samples))
-
+  normalize = functools.partial(_normalize_shard, english_only=english_only,
+                                normalizer_kwargs=normalizer_kwargs)
+  # Positions in `clean_data` and normalized text of the sampled reviews
+  positions, normalized = [], []
+  with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+    for start in range(0, len(ids), chunk_size):
+      chunk = ids[start:start + chunk_size]
+      texts = clean_data.comments.values[chunk]
+      shards = parallel.split_shards(texts, workers)
+      results = []
+      for shard_results in executor.map(normalize, shards):
+        results.extend(shard_results)
+
+      for position, text in zip(chunk, results):
+        if text is not None:
+          positions.append(position)
+          normalized.append(text)
+      n_found = min(len(positions), samples)
+      if message is not None:
+        print("{} / {} english reviews found.".format(n_found, samples))
+      if n_found == samples:
+        break
+
+  # Build the new DataFrame column-wise from the sampled rows
+  sampled_data = clean_data.iloc[positions[:samples]].reset_index(drop=True)
+  sampled_data["normalized_comments"] = normalized[:samples]
   print("\nSampled data created with shape", sampled_data.shape)
-  sampled_data["normalized_comments"] = normalizer(sampled_data.comments,
-              n_message=message)
 
   # Save new DataFrame
   stopwords = ["", "_nostopwords"][int(remove_stopwords)]
   english = ["", "_en"][int(english_only)]
   savename = "{}_reviews{}{}_nocancel_{}samples.csv".format(
-      area, stopwords, english, samples)
+      area, stopwords, english, len(sampled_data))
   sampled_data.to_csv(os.path.join(area_dir, savename), index=False)
 
 
 if __name__ == '__main__':
   args = parser.parse_args()
-  main(**vars(args))
\ No newline at end of file
+  main(**vars(args))
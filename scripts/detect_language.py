@@ -4,9 +4,8 @@ Creates a new column "language" in the DataFrame.
 """
 import argparse
 import os
-import pandas as pd
-import langdetect
-from typing import Optional
+from utils import ingestion, language_detection
+from typing import List, Optional
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--area", default="nyc", type=str,
@@ -19,43 +18,67 @@ parser.add_argument("--finish-ind", default=None, type=int,
                     help="Row index of the first data point.")
 parser.add_argument("--message", default=None, type=int,
                     help="Every how many processed texts to print messages.")
+parser.add_argument("--workers", default=1, type=int,
+                    help="Number of processes for language detection.")
+parser.add_argument("--chunk-size", default=1000, type=int,
+                    help="Number of reviews sent to a process at once.")
+parser.add_argument("--read-chunk-size", default=ingestion.CHUNKSIZE, type=int,
+                    help="Number of CSV rows read and saved at once.")
+parser.add_argument("--columns", default=None, type=str, nargs="+",
+                    help="Columns to read and save. All columns by default.")
+parser.add_argument("--unknown", default="<unk>", type=str,
+                    help="Language saved for reviews that cannot be "
+                         "identified.")
 
 
 def main(data_dir: str, area: str,
          start_ind: int = 0,
          finish_ind: Optional[int] = None,
-         message: Optional[int] = None):
-  # Load reviews for the given area
+         message: Optional[int] = None,
+         workers: int = 1,
+         chunk_size: int = 1000,
+         read_chunk_size: int = ingestion.CHUNKSIZE,
+         columns: Optional[List[str]] = None,
+         unknown: str = "<unk>"):
+  # Reviews are read, detected and saved in chunks of `read_chunk_size` rows
   area_dir = os.path.join(data_dir, area)
-  data = pd.read_csv(os.path.join(area_dir, "reviews.csv.gz"))
-  print("Loaded {} reviews.".format(area))
-  # Remove lines for which reviews are nan
-  clean_data = data[pd.notnull(data.comments)]
-
-  if finish_ind is None:
-    finish_ind = clean_data.shape[0]
-  assert finish_ind > start_ind
-  print("Detecting language from {} to {}.".format(start_ind, finish_ind))
-
-  new_cols = list(clean_data.columns) + ["comments_language"]
-  samples = finish_ind - start_ind
-  identified_data = pd.DataFrame(index=range(samples), columns=new_cols)
-  ic = 0
-  for i in range(start_ind, finish_ind):
-    identified_data.iloc[ic] = clean_data.iloc[i]
-    review = clean_data.iloc[i]["comments"]
-    try:
-      identified_data.iloc[ic]["comments_language"] = langdetect.detect(review)
-    except:
-      print("Failed to detect language for:", review)
-      identified_data.iloc[ic]["comments_language"] = "<unk>"
-    ic += 1
-    if i % message == 0:
-      print("{} / {}".format(i, finish_ind))
+  if finish_ind is not None:
+    assert finish_ind > start_ind
+  print("Detecting language of {} reviews from {} to {}.".format(
+      area, start_ind, "end" if finish_ind is None else finish_ind))
+
+  tmp_savename = "{}_reviews_withlang_{}to.csv.tmp".format(area, start_ind)
+  n_clean, n_saved = 0, 0
+  for chunk in ingestion.iter_reviews(os.path.join(area_dir, "reviews.csv.gz"),
+                                      columns=columns,
+                                      chunksize=read_chunk_size):
+    # Position of the first review of the chunk among the not-NaN reviews
+    chunk_start = n_clean
+    n_clean += len(chunk)
+    if n_clean <= start_ind:
+      continue
+    chunk = chunk.iloc[max(start_ind - chunk_start, 0):]
+    if finish_ind is not None:
+      chunk = chunk.iloc[:finish_ind - start_ind - n_saved]
+
+    languages = language_detection.detect_languages(chunk.comments, workers,
+                                                    chunk_size,
+                                                    unknown=unknown)
+    chunk = chunk.assign(comments_language=languages)
+    chunk.to_csv(tmp_savename, mode="a" if n_saved else "w",
+                 header=not n_saved, index=False)
+    n_saved += len(chunk)
+    if message is not None:
+      print("{} / {}".format(start_ind + n_saved, finish_ind or "?"))
+    if finish_ind is not None and start_ind + n_saved >= finish_ind:
+      break
 
   # Save new DataFrame
+  finish_ind = start_ind + n_saved
   savename = "{}_reviews_withlang_{}to{}.csv".format(area, start_ind, finish_ind)
-  identified_data.to_csv(savename, index=False)
+  if n_saved:
+    os.replace(tmp_savename, savename)
+    print("Saved {} reviews to {}.".format(n_saved, savename))
 
 
 if __name__ == '__main__':
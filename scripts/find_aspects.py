@@ -2,7 +2,8 @@ import os
 import numpy as np
 import pandas as pd
 import time
-from utils import custom_preprocessing, dependencies
+from aspects import dependencies
+from utils import basic_preprocessing, checkpoints, dedup, ingestion
 
 
 n_samples = None
@@ -10,9 +11,6 @@ area = "athens"
 island = None
 n_message = 400
 n_save = 10000
-# Use this to continue from a previous checkpoint
-ids_file = None
-start_index = 0
 
 
 data_dir = "/home/stavros/DATA/AirbnbReviews"
@@ -21,9 +19,9 @@ area_dir = os.path.join(data_dir, area)
 
 if island is None:
   # Either load the downloaded csv
-  data = pd.read_csv(os.path.join(area_dir, "reviews.csv.gz"))
-  clean_data = data[pd.notnull(data["comments"])]
+  clean_data = ingestion.read_reviews(os.path.join(area_dir, "reviews.csv.gz"))
   save_name = lambda n: "reviews_with_aspects_{}samples_sentiment".format(n)
+  checkpoint_name = "reviews_with_aspects_sentiment_checkpoint"
 
 else:
   # or some other file we created (eg. with island locations for southern agean)
@@ -32,19 +30,13 @@ else:
   clean_data = clean_data[clean_data.location == island]
   print("Keeping reviews from {} only.".format(island))
   save_name = lambda n: "reviews_with_aspects_{}_{}samples_sentiment".format(island, n)
+  checkpoint_name = "reviews_with_aspects_{}_sentiment_checkpoint".format(island)
 
 
-if ids_file is None:
-  ids = np.arange(len(clean_data))
-  np.random.shuffle(ids)
-  print("Shuffling data")
-  get_pkl_name = lambda n: os.path.join(area_dir, "{}.pkl".format(save_name(n)))
-else:
-  ids = np.load(ids_file)
-  print("Random indices loaded from {}".format(ids_file))
-  ids = ids[start_index:]
-  print("Starting from index {}".format(start_index))
-  get_pkl_name = lambda n: os.path.join(area_dir, "{}_start{}.pkl".format(save_name(n), start_index))
+ids = np.arange(len(clean_data))
+np.random.shuffle(ids)
+print("Shuffling data")
+get_pkl_name = lambda n: os.path.join(area_dir, "{}.pkl".format(save_name(n)))
 
 if n_samples is None or n_samples > len(ids):
   n_samples = len(clean_data)
@@ -53,36 +45,50 @@ print("{} reviews found for {}".format(len(clean_data), area))
 print("Target number of samples:", n_samples)
 print("Saving checkpoints every {} samples.".format(n_save))
 
+# Reviews that were processed in previous runs are found in the checkpoint
+# and skipped, so restarting the script continues where it stopped
+checkpoint = checkpoints.ShardedCheckpoint(
+    os.path.join(area_dir, checkpoint_name), shard_size=n_save)
+if len(checkpoint):
+  print("Continuing from checkpoint with {} processed reviews and {} "
+        "samples.".format(len(checkpoint), checkpoint.n_results))
 
-sampled_columns = list(clean_data.columns) + ["processed_comments", "aspects"]
-sampled_data = pd.DataFrame(index=range(n_samples), columns=sampled_columns)
-# Save shuffled ids in case you want to restart for the rest of the reviews later
-if island is None:
-  np.save(os.path.join(area_dir, "review_aspact_finding_random_ids.npy"), ids)
-else:
-  np.save(os.path.join(area_dir, "review_aspact_finding_random_ids_{}.npy".format(island)), ids)
-
+# Results of already processed texts so that duplicate reviews are processed once
+processed = {}
 start_time = time.time()
-i, ic = 0, 0
+i, ic = 0, checkpoint.n_results
 while ic < n_samples and i < len(ids):
   data_row = clean_data.iloc[ids[i]]
   i += 1
+  if data_row["id"] in checkpoint:
+    continue
   try:
-    processed_review = custom_preprocessing.preprocessing_pipeline(data_row["comments"])
-
-    if processed_review is not None:
-      sampled_data.iloc[ic] = data_row
-      sampled_data.iloc[ic]["processed_comments"] = processed_review
-      sampled_data.iloc[ic]["aspects"] = dependencies.feature_sentiment(processed_review)
+    text_key = dedup.normalize(data_row["comments"])
+    if text_key not in processed:
+      processed_review = basic_preprocessing.preprocessing_pipeline(data_row["comments"])
+      aspects = None
+      if processed_review is not None:
+        aspects = dependencies.feature_sentiment(processed_review)
+      processed[text_key] = (processed_review, aspects)
+    processed_review, aspects = processed[text_key]
+
+    if processed_review is None:
+      checkpoint.add(data_row["id"])
+    else:
+      record = data_row.to_dict()
+      record["processed_comments"] = processed_review
+      record["aspects"] = aspects
+      checkpoint.add(data_row["id"], record)
       ic += 1
 
       if ic % n_message == 0:
         print("{} / {} found. - time: {}".format(ic + 1, n_samples, time.time() - start_time))
-      if ic % n_save == 0:
-        sampled_data.to_pickle(get_pkl_name(ic))
-        print("Saved checkpoint with {} samples".format(ic))
   except:
     pass
 
+checkpoint.flush()
+print("Processed {} unique texts for {} reviews ({:.1f}% duplicates).".format(
+    len(processed), i, 100 * (1 - len(processed) / max(i, 1))))
 # Save to pickle
-sampled_data.to_pickle(get_pkl_name(n_samples))
\ No newline at end of file
+sampled_data = checkpoint.load()
+sampled_data.to_pickle(get_pkl_name(len(sampled_data)))
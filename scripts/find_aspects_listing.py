@@ -1,7 +1,8 @@
 import os
 import pandas as pd
 import time
-from utils import custom_preprocessing, dependencies
+from aspects import dependencies
+from utils import basic_preprocessing, dedup, ingestion
 
 
 area = "athens"
@@ -11,9 +12,8 @@ n_save = 5000
 
 data_dir = "/home/stavros/DATA/AirbnbReviews"
 area_dir = os.path.join(data_dir, area)
-reviews = pd.read_csv(os.path.join(area_dir, "reviews.csv.gz"))
-reviews = reviews[pd.notnull(reviews["listing_id"])]
-reviews = reviews[pd.notnull(reviews["comments"])]
+reviews = ingestion.read_reviews(os.path.join(area_dir, "reviews.csv.gz"),
+                                 notnull=["listing_id"])
 
 print("Loaded {} reviews found for {}".format(len(reviews), area))
 
@@ -36,18 +36,26 @@ sampled_columns = list(valid_reviews.columns) + ["processed_comments", "lemmatiz
 sampled_data = pd.DataFrame(index=range(n_samples), columns=sampled_columns)
 
 
+# Results of already processed texts so that duplicate reviews are processed once
+processed = {}
 start_time = time.time()
 i, ic = 0, 0
 while i < n_samples:
   data_row = valid_reviews.iloc[i]
   i += 1
   try:
-    processed_review = custom_preprocessing.preprocessing_pipeline(data_row["comments"])
+    text_key = dedup.normalize(data_row["comments"])
+    if text_key not in processed:
+      processed_review = basic_preprocessing.preprocessing_pipeline(data_row["comments"])
+      aspects, lemmatized_review = None, None
+      if processed_review is not None:
+        aspects, lemmatized_review = dependencies.feature_sentiment(processed_review, lemmatize_text=True)
+      processed[text_key] = (processed_review, aspects, lemmatized_review)
+    processed_review, aspects, lemmatized_review = processed[text_key]
 
     if processed_review is not None:
       sampled_data.iloc[ic] = data_row
       sampled_data.iloc[ic]["processed_comments"] = processed_review
-      aspects, lemmatized_review = dependencies.feature_sentiment(processed_review, lemmatize_text=True)
       sampled_data.iloc[ic]["lemmatized_comments"] = lemmatized_review
       sampled_data.iloc[ic]["aspects"] = aspects
       ic += 1
@@ -60,5 +68,7 @@ while i < n_samples:
   except:
     pass
 
+print("Processed {} unique texts for {} reviews ({:.1f}% duplicates).".format(
+    len(processed), i, 100 * (1 - len(processed) / max(i, 1))))
 # Save to pickle
 sampled_data.to_pickle(get_pkl_name(n_samples))
\ No newline at end of file
@@ -1,11 +1,14 @@
 import os
 import pandas as pd
-from utils import dependencies
+from aspects import dependencies, result_cache
+from utils import dedup
 
 
 area = "south_aegean"
 full_filename = "reviews_with_aspects_Santorini_100266samples.pkl"
 n_message = 500
+# Cache shared by all areas so that repeated texts are not processed again
+cache_file = "aspects_sentiment_cache.sqlite"
 
 filename, filetype = full_filename.split(".")
 data_dir = "/home/stavros/DATA/AirbnbReviews"
@@ -20,8 +23,14 @@ else:
 n_samples = len(clean_data)
 print("{} reviews read from {}".format(n_samples, full_filename))
 
-counter = dependencies.FeatureSentimentCounter(n_message)
-sentiments = clean_data["processed_comments"].map(counter.feature_sentiment)
+cache = result_cache.ResultCache(os.path.join(data_dir, cache_file),
+                                 rules_version=dependencies.RULES_VERSION)
+counter = dependencies.FeatureSentimentCounter(n_message, cache=cache)
+# Find features of each unique text once and copy them to duplicate reviews
+unique_comments, codes = dedup.unique_texts(clean_data["processed_comments"])
+sentiments = dedup.fan_out(
+    list(unique_comments.map(counter.feature_sentiment)), codes)
+cache.close()
 
 # Save to pickle
 clean_data["aspects_sentiment"] = sentiments
@@ -12,7 +12,7 @@ def main(filename: str, cut_off: Optional[float] = None, plot: bool = False,
   aspects = containers.DataAspects.load(data_dir)
 
   if cut_off is not None:
-    aspects.merge(cut_off=0.4)
+    aspects.merge(cut_off=cut_off)
     container = aspects.merged_container
   else:
     container = aspects.container
@@ -1,7 +1,6 @@
 import re
-import langdetect
-from utils import contractions
-from typing import Optional
+from utils import contractions, language_detection
+from typing import List, Optional, Sequence
 # TODO: Add docstrings
 
 
@@ -39,20 +38,21 @@ def remove_special_characters(text: str, remove_digits: bool = False) -> str:
 
 
 def find_language(text: str) -> str:
-  try:
-    language = langdetect.detect(text)
-  except:
-    print("Failed to identify language of:", text)
-    return "<UNK>"
-  return language
+  return language_detection.detect(text)
 
 
-def is_english(text: str) -> str:
-  return find_language(text) == "en"
+def is_english(text: str, tiered: bool = True) -> bool:
+  return language_detection.is_english(text, tiered)
 
 
-def preprocessing_pipeline(text: str, check_language: bool = True
-                           ) -> Optional[str]:
+def are_english(texts: Sequence[str], workers: int = 1,
+                chunk_size: int = 1000, tiered: bool = True) -> List[bool]:
+  """Batch version of `is_english` that uses `workers` processes."""
+  return language_detection.are_english(texts, workers, chunk_size, tiered)
+
+
+def preprocessing_pipeline(text: str, check_language: bool = True,
+                           language: Optional[str] = None) -> Optional[str]:
   """This does the following preprocessing pipeline:
 
       * Detect language and whether review is good (eg. more than five characters).
@@ -62,14 +62,15 @@ def preprocessing_pipeline(text: str, check_language: bool = True
       MOVED * Replaces person names with the word `Host`
 
     If this returns `None` then we ignore the review.
+    The `language` of the text can be given if it was already detected in
+    batch with `language_detection.detect_languages`.
   """
   if check_language:
-    try:
-      language = langdetect.detect(text)
-    except:
-      print("Failed to identify language of:", text)
-      return None
-    if language != "en":
+    if language is None:
+      english = is_english(text)
+    else:
+      english = language == "en"
+    if not english:
       return None
 
   ptext = expand_contractions(text)
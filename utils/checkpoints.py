@@ -0,0 +1,138 @@
+"""Append-only checkpoints for scripts that process reviews one at a time.
+
+A checkpoint is a directory with fixed-size result shards and a manifest:
+
+  shard_00000.pkl, shard_00001.pkl, ...: DataFrames with the results.
+  manifest.txt: One line per processed review with its ID and the index of
+    the shard that holds its result ("-" for reviews without result).
+
+Writing a shard costs time proportional to the rows of this shard only.
+The manifest is appended after the shard is saved, so a shard is used only
+if all of its rows were recorded and an interrupted run simply processes the
+rows of the unrecorded shard again. A run that is killed while appending
+can leave a partial last line and only some rows of the last shard in the
+manifest; these lines are dropped when the checkpoint is loaded.
+"""
+import collections
+import os
+import pandas as pd
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+_MANIFEST = "manifest.txt"
+
+
+class ShardedCheckpoint:
+
+  def __init__(self, directory: str, shard_size: int = 10000):
+    """Constructor.
+
+    Loads the manifest if the checkpoint directory already exists.
+
+    Args:
+      directory: Directory of the checkpoint.
+      shard_size: Number of results in each shard.
+    """
+    self.directory = directory
+    self.shard_size = shard_size
+    os.makedirs(directory, exist_ok=True)
+
+    self.processed = set()
+    self.n_results = 0
+    self.n_shards = 0
+    manifest = os.path.join(directory, _MANIFEST)
+    if os.path.exists(manifest):
+      for row_id, shard in self._read_manifest(manifest):
+        self.processed.add(row_id)
+        if shard != "-":
+          self.n_results += 1
+          self.n_shards = max(self.n_shards, int(shard) + 1)
+
+    self._ids = []
+    self._records = []
+
+  def _read_manifest(self, manifest: str) -> List[Tuple[str, str]]:
+    """Reads the (row ID, shard) entries of the complete manifest lines.
+
+    Partial or malformed lines and the lines of a last shard that was not
+    fully recorded are dropped, and the manifest is rewritten without them
+    so that the next lines are appended after a complete line.
+    """
+    with open(manifest, "r") as file:
+      lines = file.readlines()
+    entries = []
+    for line in lines:
+      fields = line.rstrip("\n").split("\t")
+      if (line.endswith("\n") and len(fields) == 2 and
+          (fields[1] == "-" or fields[1].isdigit())):
+        entries.append((fields[0], fields[1]))
+
+    counts = collections.Counter(shard for _, shard in entries if shard != "-")
+    if counts:
+      last = max(counts, key=int)
+      path = self.shard_path(int(last))
+      if not os.path.exists(path) or len(pd.read_pickle(path)) != counts[last]:
+        entries = [entry for entry in entries if entry[1] != last]
+
+    if len(entries) < len(lines):
+      print("Dropped {} incomplete lines from the checkpoint manifest.".format(
+          len(lines) - len(entries)))
+      with open(manifest + ".tmp", "w") as file:
+        file.writelines("{}\t{}\n".format(*entry) for entry in entries)
+      os.replace(manifest + ".tmp", manifest)
+    return entries
+
+  def __contains__(self, row_id: Hashable) -> bool:
+    return str(row_id) in self.processed
+
+  def __len__(self) -> int:
+    """Number of processed rows, including rows not saved yet."""
+    return len(self.processed)
+
+  def shard_path(self, shard: int) -> str:
+    return os.path.join(self.directory, "shard_{:05d}.pkl".format(shard))
+
+  def add(self, row_id: Hashable, record: Optional[Dict[str, Any]] = None):
+    """Marks a row as processed and saves its result.
+
+    Args:
+      row_id: Unique ID of the row (eg. the review id).
+      record: Dictionary with the result columns of this row or `None` if
+        the row does not have a result (eg. it is not in english).
+    """
+    row_id = str(row_id)
+    self.processed.add(row_id)
+    self._ids.append((row_id, record is not None))
+    if record is not None:
+      self._records.append(record)
+      self.n_results += 1
+      if len(self._records) >= self.shard_size:
+        self.flush()
+
+  def flush(self):
+    """Saves pending results to a new shard and appends them to manifest."""
+    if not self._ids:
+      return
+    shard = "-"
+    if self._records:
+      shard = str(self.n_shards)
+      path = self.shard_path(self.n_shards)
+      pd.DataFrame(self._records).to_pickle(path + ".tmp")
+      os.replace(path + ".tmp", path)
+      self.n_shards += 1
+
+    lines = ["{}\t{}\n".format(row_id, shard if has_record else "-")
+             for row_id, has_record in self._ids]
+    with open(os.path.join(self.directory, _MANIFEST), "a") as file:
+      file.writelines(lines)
+      file.flush()
+      os.fsync(file.fileno())
+    print("Saved checkpoint shard with {} results ({} in total).".format(
+        len(self._records), self.n_results))
+    self._ids, self._records = [], []
+
+  def load(self) -> pd.DataFrame:
+    """Loads the results of all saved shards in a single DataFrame."""
+    shards = [pd.read_pickle(self.shard_path(i)) for i in range(self.n_shards)]
+    if not shards:
+      return pd.DataFrame()
+    return pd.concat(shards, ignore_index=True)
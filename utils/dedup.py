@@ -0,0 +1,47 @@
+"""Deduplication of review texts so that each unique text is processed once."""
+import numpy as np
+import pandas as pd
+from typing import Any, List, Sequence, Tuple
+
+
+def normalize(text: str) -> str:
+  """Normalization applied before comparing texts: whitespace is collapsed."""
+  return " ".join(text.split())
+
+
+def unique_texts(texts: pd.Series) -> Tuple[pd.Series, np.ndarray]:
+  """Finds the unique texts of a Series.
+
+  Texts are compared after `normalize`. The first occurrence of each
+  unique text is kept as it is. Values that are not strings (eg. NaN) are
+  not normalized and missing values are kept as one unique text.
+
+  Args:
+    texts: Series with review texts.
+
+  Returns:
+    unique: Series with the first occurrence of each unique text, in the
+      order of first appearance.
+    codes: Array with the position in `unique` of each text in `texts`.
+      Use `fan_out` with it to map results of `unique` back to `texts`.
+  """
+  normalized = texts.map(lambda text: normalize(text)
+                         if isinstance(text, str) else text)
+  codes, _ = pd.factorize(normalized, use_na_sentinel=False)
+  # `factorize` numbers the texts in the order of first appearance
+  _, first = np.unique(codes, return_index=True)
+  unique = texts.iloc[first]
+
+  n_duplicates = len(texts) - len(unique)
+  print("Deduplication kept {} unique out of {} texts ({:.1f}% "
+        "duplicates).".format(len(unique), len(texts),
+                              100 * n_duplicates / max(len(texts), 1)))
+  return unique, codes
+
+
+def fan_out(results: Sequence[Any], codes: np.ndarray) -> List[Any]:
+  """Maps the results of unique texts back to every original text.
+
+  Rows with the same text share the same result object.
+  """
+  return [results[code] for code in codes]
@@ -1,5 +1,9 @@
 """Hardcoded directories to import when needed."""
+import os
 
 airbnb = "/home/stavros/DATA/AirbnbReviews"
 trip_advisor = "/home/stavros/DATA/TripAdvisorReviews"
 google_word2vec = "/home/stavros/DATA/GoogleNews-vectors-negative300.bin.gz"
+opinion_lexicon = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "opinion-lexicon")
@@ -0,0 +1,142 @@
+"""On-disk cache of parsed spaCy docs keyed by the hash of their text.
+
+Docs are saved with `Doc.to_bytes` in a directory that is specific to the
+model name, model version and the pipeline components that were applied, so
+changing any of these never returns stale docs. The total size of the cache
+is capped and the least recently used docs are deleted first.
+"""
+import hashlib
+import itertools
+import os
+from spacy import tokens
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Doc attributes that aspect extraction and lemmatization do not need
+_EXCLUDE = ["tensor", "user_data"]
+
+
+class DocCache:
+
+  def __init__(self, cache_dir: str, nlp, components: Sequence[str],
+               variant: str = "", max_size_mb: float = 1024):
+    """Constructor.
+
+    Args:
+      cache_dir: Root directory of the cache.
+      nlp: spaCy language object used to parse the docs. Its name and
+        version are part of the cache key.
+      components: Pipeline components that are applied on the docs.
+      variant: Extra string that distinguishes docs that were processed
+        differently with the same components (eg. with a prefilter).
+      max_size_mb: Maximum total size of all docs in `cache_dir` in MB,
+        including docs cached for other models or components.
+    """
+    self.nlp = nlp
+    self.root = cache_dir
+    namespace = [nlp.meta.get("lang", ""), nlp.meta.get("name", ""),
+                 nlp.meta.get("version", ""), "+".join(components)]
+    if variant:
+      namespace.append(variant)
+    self.directory = os.path.join(cache_dir, "_".join(namespace))
+    os.makedirs(self.directory, exist_ok=True)
+
+    self.max_size = int(max_size_mb * 2 ** 20)
+    self.size = sum(size for _, size, _ in self._files())
+    self.hits, self.misses = 0, 0
+
+  @staticmethod
+  def key(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+  def path(self, key: str) -> str:
+    return os.path.join(self.directory, key[:2], ".".join([key, "bin"]))
+
+  def get(self, text: str) -> Optional[tokens.Doc]:
+    path = self.path(self.key(text))
+    try:
+      with open(path, "rb") as file:
+        doc = tokens.Doc(self.nlp.vocab).from_bytes(file.read())
+    except (OSError, ValueError):
+      return None
+    # Update modification time, which is used for evicting old docs
+    try:
+      os.utime(path)
+    except FileNotFoundError:
+      # Evicted by another process in the meantime
+      pass
+    return doc
+
+  def put(self, text: str, doc: tokens.Doc):
+    path = self.path(self.key(text))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = doc.to_bytes(exclude=_EXCLUDE)
+    # Other processes that share the cache never see half written docs
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temp_path, "wb") as file:
+      file.write(data)
+    os.replace(temp_path, path)
+    self.size += len(data)
+
+  def pipe(self, texts: Iterable[str],
+           parse: Callable[[List[str]], Iterable[tokens.Doc]],
+           batch_size: int = 1000) -> Iterator[tokens.Doc]:
+    """Generates docs for the given texts, parsing only those not cached.
+
+    Args:
+      texts: Texts to generate docs for.
+      parse: Function that takes a list of texts and returns their parsed
+        docs in the same order (eg. `nlp.pipe`). Called once per batch with
+        the texts of the batch that are not cached.
+      batch_size: Number of texts to look up in the cache at once.
+    """
+    texts = iter(texts)
+    while True:
+      batch = list(itertools.islice(texts, batch_size))
+      if not batch:
+        break
+      docs = [self.get(text) for text in batch]
+      missing = [text for text, doc in zip(batch, docs) if doc is None]
+      parsed = iter(parse(missing)) if missing else iter(())
+      for text, doc in zip(batch, docs):
+        if doc is None:
+          doc = next(parsed)
+          self.put(text, doc)
+        yield doc
+      self.hits += len(batch) - len(missing)
+      self.misses += len(missing)
+      if self.size > self.max_size:
+        self.evict()
+
+    print("\nDoc cache: {} docs loaded, {} docs parsed.".format(
+        self.hits, self.misses))
+
+  def evict(self, fraction: float = 0.9):
+    """Deletes least recently used docs until the cache fits in its cap.
+
+    Docs are deleted until the cache size drops to `fraction` of the cap,
+    so that eviction does not run again after every batch.
+    """
+    files = sorted(self._files(), key=lambda f: f[2])
+    for path, size, _ in files:
+      if self.size <= fraction * self.max_size:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        # Already evicted by another process that shares the cache
+        pass
+      self.size -= size
+
+  def _files(self) -> Iterator[Tuple[str, int, float]]:
+    """Path, size and modification time of all docs in the cache root."""
+    for root, _, filenames in os.walk(self.root):
+      for filename in filenames:
+        if filename.endswith(".tmp"):
+          # Doc that another process is writing
+          continue
+        path = os.path.join(root, filename)
+        try:
+          stat = os.stat(path)
+        except FileNotFoundError:
+          continue
+        yield path, stat.st_size, stat.st_mtime
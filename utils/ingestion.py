@@ -0,0 +1,67 @@
+"""Chunked reading of review CSV dumps with a fixed memory budget.
+
+`pd.read_csv` on a full city dump loads every column of every review before
+anything is filtered. Here the file is read in chunks of `chunksize` rows,
+only the requested columns are parsed and the NaN, length and custom
+filters are applied to each chunk, so only the reviews that pass the
+filters are kept in memory (or none when chunks are consumed one by one
+with `iter_reviews`).
+"""
+import pandas as pd
+from typing import Callable, Iterator, Optional, Sequence
+
+CHUNKSIZE = 100000
+
+
+def iter_reviews(path: str, text_column: str = "comments",
+                 columns: Optional[Sequence[str]] = None,
+                 min_length: int = 0,
+                 notnull: Sequence[str] = (),
+                 row_filter: Optional[Callable[[pd.DataFrame], pd.Series]] = None,
+                 chunksize: int = CHUNKSIZE) -> Iterator[pd.DataFrame]:
+  """Reads a reviews CSV in filtered chunks.
+
+  Args:
+    path: Path of the CSV file (can be compressed).
+    text_column: Column with the review texts. Rows where it is NaN are
+      dropped.
+    columns: Columns to read. All columns are read if `None`. The text
+      column is always read.
+    min_length: Rows with texts of `min_length` characters or fewer are
+      dropped.
+    notnull: Other columns that must not be NaN.
+    row_filter: Function that takes a chunk and returns a boolean Series of
+      the rows to keep.
+    chunksize: Number of CSV rows in each chunk.
+
+  Returns:
+    Iterator over the filtered chunks. The index of each chunk is the row
+    number in the CSV file, as when the whole file is read at once.
+  """
+  usecols = None
+  if columns is not None:
+    usecols = list(columns)
+    for column in [text_column] + list(notnull):
+      if column not in usecols:
+        usecols.append(column)
+
+  for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunksize):
+    keep = pd.notnull(chunk[text_column])
+    for column in notnull:
+      keep &= pd.notnull(chunk[column])
+    if min_length > 0:
+      keep &= chunk[text_column].str.len() > min_length
+    if row_filter is not None:
+      keep &= row_filter(chunk)
+    yield chunk[keep]
+
+
+def read_reviews(path: str, *args, **kwargs) -> pd.DataFrame:
+  """Reads the filtered reviews of a CSV file in a single DataFrame.
+
+  Accepts the same arguments as `iter_reviews`.
+  """
+  chunks = list(iter_reviews(path, *args, **kwargs))
+  if not chunks:
+    return pd.DataFrame()
+  return pd.concat(chunks)
@@ -0,0 +1,170 @@
+"""Batch language detection of reviews using `langdetect` in worker processes.
+
+`langdetect` is probabilistic and draws random n-grams from each text, so
+the seed of `DetectorFactory` is fixed when this module is imported and in
+every worker process. With a fixed seed the language of a text does not
+depend on the process or the order in which texts are detected.
+
+Most reviews are obviously english or obviously not, so `is_english` and
+`are_english` first try `quick_is_english`, which only looks at the script
+of the letters and the fraction of english stopwords, and run `langdetect`
+only for the texts that this cannot decide.
+"""
+import concurrent.futures
+import functools
+import re
+import langdetect
+from typing import Iterator, List, Optional, Sequence
+
+SEED = 0
+# Language returned for texts that `langdetect` fails on
+UNKNOWN = "<UNK>"
+
+# Frequent english words that are not words of other languages written in
+# latin script. Short words such as "i", "to", "was", "we", "is", "also" or
+# "had" are left out because they are common in polish, dutch, german or
+# croatian reviews.
+ENGLISH_STOPWORDS = frozenset([
+    "the", "and", "with", "were", "would", "this", "that", "very", "they",
+    "their", "there", "which", "what", "everything", "really", "could",
+    "about", "when", "have", "been", "from", "you", "your", "our", "she",
+    "his", "just", "here", "should", "because", "after", "where"])
+_WORD = re.compile(r"[^\W\d_]+")
+# Quick decisions need at least this many words
+MIN_WORDS = 4
+# Texts with at least this fraction and number of stopwords are english
+EN_RATIO = 0.15
+MIN_STOPWORDS = 2
+# Texts with more than this fraction of non-ascii letters are not english
+MAX_NON_ASCII = 0.2
+
+
+def set_seed(seed: int = SEED):
+  langdetect.DetectorFactory.seed = seed
+
+
+set_seed()
+
+
+def detect(text: str, unknown: str = UNKNOWN) -> str:
+  try:
+    language = langdetect.detect(text)
+  except:
+    print("Failed to identify language of:", text)
+    return unknown
+  return language
+
+
+def quick_is_english(text: str) -> Optional[bool]:
+  """Cheap first stage of english detection.
+
+  Texts are rejected only for their script (no letters or mostly non-ascii
+  letters). Few stopwords are not evidence of another language, because
+  short english reviews are often written without function words (eg.
+  "Great location, friendly staff, clean rooms").
+
+  Returns:
+    True for texts with many distinctively english words, False for texts that are
+    not written in latin script and `None` for texts that need `langdetect`.
+  """
+  words = _WORD.findall(text.lower())
+  if not words:
+    # `langdetect` fails on texts without letters
+    return False
+  n_letters = sum(len(word) for word in words)
+  n_non_ascii = sum(not char.isascii() for word in words for char in word)
+  if n_non_ascii > MAX_NON_ASCII * n_letters:
+    return False
+  if len(words) < MIN_WORDS:
+    return None
+
+  n_stopwords = sum(word in ENGLISH_STOPWORDS for word in words)
+  if n_stopwords >= max(MIN_STOPWORDS, EN_RATIO * len(words)):
+    return True
+  return None
+
+
+def is_english(text: str, tiered: bool = True) -> bool:
+  """Detects if a text is english.
+
+  Args:
+    text: Text to check.
+    tiered: If True `langdetect` is used only when `quick_is_english` cannot
+      decide. If False `langdetect` is used for every text.
+  """
+  if tiered:
+    decision = quick_is_english(text)
+    if decision is not None:
+      return decision
+  return detect(text) == "en"
+
+
+def _detect_chunk(texts: Sequence[str], unknown: str = UNKNOWN) -> List[str]:
+  return [detect(text, unknown) for text in texts]
+
+
+def iter_languages(texts: Sequence[str], workers: int = 1,
+                   chunk_size: int = 1000, seed: int = SEED,
+                   unknown: str = UNKNOWN) -> Iterator[List[str]]:
+  """Detects the language of texts in chunks.
+
+  Args:
+    texts: Sequence of texts.
+    workers: Number of worker processes. Detection runs in the current
+      process if this is 1.
+    chunk_size: Number of texts in each chunk.
+    seed: Seed for `langdetect` in every process.
+    unknown: Language of texts that `langdetect` fails on.
+
+  Returns:
+    Iterator over the chunks of `texts` in the original order. Each item is
+    a list with the language of every text in the chunk.
+  """
+  texts = list(texts)
+  chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+  detect_chunk = functools.partial(_detect_chunk, unknown=unknown)
+  if workers <= 1:
+    set_seed(seed)
+    for chunk in chunks:
+      yield detect_chunk(chunk)
+    return
+
+  with concurrent.futures.ProcessPoolExecutor(
+      max_workers=workers, initializer=set_seed,
+      initargs=(seed,)) as executor:
+    for languages in executor.map(detect_chunk, chunks):
+      yield languages
+
+
+def detect_languages(texts: Sequence[str], workers: int = 1,
+                     chunk_size: int = 1000, seed: int = SEED,
+                     unknown: str = UNKNOWN) -> List[str]:
+  """Language of each text in the same order as `texts`."""
+  languages = []
+  for chunk_languages in iter_languages(texts, workers, chunk_size, seed,
+                                        unknown):
+    languages.extend(chunk_languages)
+  return languages
+
+
+def are_english(texts: Sequence[str], workers: int = 1,
+                chunk_size: int = 1000, tiered: bool = True) -> List[bool]:
+  """Batch version of `is_english`.
+
+  The quick stage runs in the current process and only the texts it cannot
+  decide are sent to `langdetect` in `workers` processes.
+  """
+  texts = list(texts)
+  if tiered:
+    decisions = [quick_is_english(text) for text in texts]
+  else:
+    decisions = [None] * len(texts)
+  ambiguous = [i for i, decision in enumerate(decisions) if decision is None]
+  languages = detect_languages([texts[i] for i in ambiguous], workers,
+                               chunk_size)
+  for i, language in zip(ambiguous, languages):
+    decisions[i] = language == "en"
+  if tiered:
+    print("Language of {} / {} texts decided without langdetect.".format(
+        len(texts) - len(ambiguous), len(texts)))
+  return decisions
@@ -0,0 +1,68 @@
+"""Helpers for running preprocessing steps on shards in worker processes."""
+import concurrent.futures
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+
+def split_shards(items: Sequence, n_shards: int) -> List[Sequence]:
+  """Splits a sequence to `n_shards` contiguous shards of almost equal size.
+
+  Shards are contiguous so that concatenating the results of each shard
+  gives back the original order.
+  """
+  n_shards = max(1, min(n_shards, len(items)))
+  size, extra = divmod(len(items), n_shards)
+  shards, start = [], 0
+  for i in range(n_shards):
+    end = start + size + int(i < extra)
+    shards.append(items[start:end])
+    start = end
+  return shards
+
+
+def _timed_call(func: Callable, shard: Sequence) -> Tuple[List, float]:
+  """Helper method for `map_shards` that also returns the worker time."""
+  start_time = time.time()
+  results = func(shard)
+  return results, time.time() - start_time
+
+
+def map_shards(func: Callable[[Sequence], List], items: Sequence,
+               workers: int = 1, n_shards: Optional[int] = None) -> List:
+  """Applies `func` on shards of `items` using a pool of worker processes.
+
+  Args:
+    func: Function that takes a shard (slice of `items`) and returns a list
+      with one result per item. It has to be defined on module level so that
+      it can be pickled.
+    items: Sequence of items to process.
+    workers: Number of worker processes.
+    n_shards: Number of shards to split `items`. Defaults to `workers`.
+
+  Returns:
+    List with the results of all items in the original order.
+  """
+  if n_shards is None:
+    n_shards = workers
+  shards = split_shards(items, n_shards)
+
+  start_time = time.time()
+  with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+    shard_results = list(executor.map(_timed_call,
+                                      [func] * len(shards), shards))
+  wall_time = time.time() - start_time
+
+  results = []
+  for shard_result, _ in shard_results:
+    results.extend(shard_result)
+
+  # Worker times include the setup that `func` does in every worker (eg.
+  # loading the spaCy model), so they are not the time of a serial run. The
+  # speedup is the wall time of a run with one worker over this wall time.
+  worker_times = [shard_time for _, shard_time in shard_results]
+  print("\nProcessed {} items in {} shards with {} workers.".format(
+      len(results), len(shards), workers))
+  print("Wall time: {:.2f}s - Worker time including setup: {:.2f}s total, "
+        "{:.2f}s slowest".format(wall_time, sum(worker_times),
+                                 max(worker_times, default=0.0)))
+  return results
@@ -25,10 +25,12 @@ class CorpusNormalizer:
             self.BeautifulSoup = bs4.BeautifulSoup
 
         if text_lemmatization:
-            import spacy
+            from utils import spacy_preprocessing
             # I changed spacy's model from 'en_core' to 'en_core_web_sm'
-            self.nlp = spacy.load('en_core_web_sm', parse=True, tag=True,
-                                  entity=True)
+            # Lemmatization needs only the tagger of the shared model
+            self.nlp = spacy_preprocessing.load_nlp(["tagger"])
+            self.nlp_disable = spacy_preprocessing.unused_components(
+                self.nlp, ["tagger"])
         if stopword_removal:
             import nltk
             from nltk.tokenize import toktok
@@ -80,7 +82,7 @@ class CorpusNormalizer:
         return text
 
     def lemmatize_text(self, text):
-        text = self.nlp(text)
+        text = self.nlp(text, disable=self.nlp_disable)
         text = ' '.join([word.lemma_ if word.lemma_ != '-PRON-' else word.text
                          for word in text])
         return text
@@ -0,0 +1,139 @@
+"""Per-stage profiling of wall time, CPU time, throughput and memory.
+
+Stages of a script are wrapped in `Profiler.stage` and the profiler can
+write all records as a JSON report:
+
+  profiler = profiling.Profiler(cprofile_dir="profiles")
+  with profiler.stage("parse", n_items=len(texts)):
+    docs = parse(texts)
+  profiler.save("report.json")
+
+CPU time includes the time of worker processes that finished during the
+stage. Peak RSS values are cumulative: `peak_rss_mb_cumulative` is the peak
+of the main process since it started and `children_peak_rss_mb_cumulative`
+the peak of the largest worker process that finished so far, so a stage is
+responsible for a new peak if its value is larger than the value of the
+previous stage.
+
+If `cprofile_dir` is given every stage is also profiled with `cProfile` and
+the stats are saved as `<stage>.prof` files that can be opened with `pstats`
+or `snakeviz`.
+"""
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+  """Peak resident memory in MB since the process started.
+
+  Args:
+    who: `resource.RUSAGE_SELF` for the current process or
+      `resource.RUSAGE_CHILDREN` for the largest child process that
+      finished.
+  """
+  peak = resource.getrusage(who).ru_maxrss
+  # Linux reports the peak in KB and macOS in bytes
+  if sys.platform == "darwin":
+    return peak / 2 ** 20
+  return peak / 2 ** 10
+
+
+def _children_cpu_time() -> float:
+  usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+  return usage.ru_utime + usage.ru_stime
+
+
+class Profiler:
+
+  def __init__(self, cprofile_dir: Optional[str] = None):
+    """Constructor.
+
+    Args:
+      cprofile_dir: If given, each stage is profiled with `cProfile` and
+        the stats are saved in this directory.
+    """
+    self.cprofile_dir = cprofile_dir
+    if cprofile_dir is not None:
+      os.makedirs(cprofile_dir, exist_ok=True)
+    self.started = datetime.datetime.now().isoformat()
+    self.stages = []
+
+  @contextlib.contextmanager
+  def stage(self, name: str, n_items: Optional[int] = None
+            ) -> Iterator[Dict[str, Any]]:
+    """Records a stage of the script.
+
+    Args:
+      name: Name of the stage in the report.
+      n_items: Number of items (eg. reviews) that the stage processes. It
+        can also be set in the yielded record if it is known only at the
+        end of the stage.
+
+    Yields:
+      The record of the stage as a dictionary.
+    """
+    record = {"name": name, "n_items": n_items}
+    profile = None
+    if self.cprofile_dir is not None:
+      profile = cProfile.Profile()
+
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    start_children = _children_cpu_time()
+    if profile is not None:
+      profile.enable()
+    try:
+      yield record
+    finally:
+      if profile is not None:
+        profile.disable()
+      wall_time = time.perf_counter() - start_wall
+      record["wall_time"] = wall_time
+      record["cpu_time"] = time.process_time() - start_cpu
+      record["children_cpu_time"] = _children_cpu_time() - start_children
+      record["peak_rss_mb_cumulative"] = peak_rss_mb()
+      record["children_peak_rss_mb_cumulative"] = peak_rss_mb(
+          resource.RUSAGE_CHILDREN)
+      if record["n_items"] is not None and wall_time > 0:
+        record["items_per_sec"] = record["n_items"] / wall_time
+      else:
+        record["items_per_sec"] = None
+      if profile is not None:
+        path = os.path.join(self.cprofile_dir, "{}.prof".format(name))
+        profile.dump_stats(path)
+        record["cprofile"] = path
+      self.stages.append(record)
+
+  def report(self) -> Dict[str, Any]:
+    return {"started": self.started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "argv": sys.argv,
+            "total_wall_time": sum(s["wall_time"] for s in self.stages),
+            "stages": self.stages}
+
+  def summary(self) -> str:
+    lines = ["{:<20} {:>10} {:>10} {:>12} {:>10} {:>14}".format(
+        "stage", "wall (s)", "cpu (s)", "items/s", "RSS (MB)",
+        "child RSS (MB)")]
+    for s in self.stages:
+      items_per_sec = s["items_per_sec"]
+      lines.append("{:<20} {:>10.2f} {:>10.2f} {:>12} {:>10.1f} {:>14.1f}".format(
+          s["name"], s["wall_time"], s["cpu_time"] + s["children_cpu_time"],
+          "-" if items_per_sec is None else "{:.1f}".format(items_per_sec),
+          s["peak_rss_mb_cumulative"], s["children_peak_rss_mb_cumulative"]))
+    return "\n".join(lines)
+
+  def save(self, path: str):
+    with open(path, "w") as file:
+      json.dump(self.report(), file, indent=2)
+    print("\nSaved profiling report to {}.".format(path))
+    print(self.summary())
@@ -1,55 +1,242 @@
+import functools
+import itertools
 import re
 import spacy
 import time
 from spacy import tokens
-from typing import Iterable, List
+from utils import doc_cache
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence
+
+MODEL_NAME = "en_core_web_sm"
+PIPELINE_COMPONENTS = ("tagger", "parser", "ner")
+# Pipeline components required by each output of the aspect extraction
+OUTPUT_COMPONENTS = {"aspects": ("tagger", "parser"),
+                     "lemmas": ("tagger",),
+                     "host": ("ner",)}
+# Model shared by all modules, see `load_nlp`
+_NLP = None
+
+
+def components_for(outputs: Iterable[str]) -> List[str]:
+  """Pipeline components required to calculate the given outputs."""
+  components = set()
+  for output in outputs:
+    components.update(OUTPUT_COMPONENTS[output])
+  return [name for name in PIPELINE_COMPONENTS if name in components]
+
+
+def load_nlp(components: Sequence[str] = PIPELINE_COMPONENTS):
+  """Loads the spaCy model that is shared by all modules of a process.
+
+  The model is loaded only with the requested pipeline components. If a later
+  call requests a component that is not loaded, the model is reloaded once
+  with all components requested so far. Components of the shared model that
+  a specific call does not need should be disabled when applying it
+  (see `unused_components`).
+  """
+  global _NLP
+  loaded = set() if _NLP is None else set(_NLP.pipe_names)
+  if _NLP is None or not loaded.issuperset(components):
+    loaded.update(components)
+    disable = [name for name in PIPELINE_COMPONENTS if name not in loaded]
+    _NLP = spacy.load(MODEL_NAME, disable=disable)
+  return _NLP
+
+
+def unused_components(nlp, components: Sequence[str]) -> List[str]:
+  """Components of a loaded model that are not in `components`."""
+  return [name for name in nlp.pipe_names if name not in components]
+
+
+def replace_host_doc(doc: tokens.Doc) -> str:
+  """Replaces PERSON entities of a single doc with the word 'Host'."""
+  text = doc.text
+  names = {token.text for token in doc.ents if token.label_ == "PERSON"}
+  for name in names:
+    text = re.sub(name, "Host", text)
+  return text
 
 
 def replace_host(docs: Iterable[tokens.Doc]) -> List[str]:
   """Replaces PERSON entities with the word 'Host'."""
-  texts = []
-  for doc in docs:
-    texts.append(doc.text)
-    names = {token.text for token in doc.ents if token.label_ == "PERSON"}
-    for name in names:
-      texts[-1] = re.sub(name, "Host", texts[-1])
-  return texts
+  return [replace_host_doc(doc) for doc in docs]
+
+
+def token_lemma(token: tokens.Token) -> str:
+  """Token lemma, keeping the original text for pronouns."""
+  return token.lemma_ if token.lemma_ != '-PRON-' else token.text
+
+
+def join_lemmas(lemmas: Iterable[str]) -> str:
+  """Joins lemmas to lower case text with letter characters only."""
+  text = " ".join(lemmas)
+  # Leave only letter characters
+  text = re.sub("[^a-zA-z\s]", " ", text)
+  # Substitute any white space character with a single space
+  text = " ".join(text.split())
+  # Make lower case
+  return text.lower()
+
+
+def lemmatize_doc(doc: tokens.Doc) -> str:
+  """Lemmatized lower case text of a single doc with letter characters only."""
+  return join_lemmas(token_lemma(token) for token in doc)
 
 
 def lemmatize(docs: Iterable[tokens.Doc]) -> List[str]:
-  texts = []
   start_time = time.time()
-
-  for doc in docs:
-    text = " ".join([token.lemma_ if token.lemma_ != '-PRON-' else token.text
-                     for token in doc])
-    # Leave only letter characters
-    text = re.sub("[^a-zA-z\s]", " ", text)
-    # Substitute any white space character with a single space
-    text = " ".join(text.split())
-    # Make lower case
-    texts.append(text.lower())
+  texts = [lemmatize_doc(doc) for doc in docs]
 
   print("\nLemmatized {} reviews.".format(len(texts)))
   print(time.time() - start_time)
   return texts
 
 
-def apply_spacy(texts: Iterable[str], parse=True, tag=True, entity=True
-                ) -> Iterable[tokens.Doc]:
-  nlp = spacy.load('en_core_web_sm', parse=parse, tag=tag, entity=entity)
+def apply_pipes(nlp, docs: Iterable[tokens.Doc], batch_size: int = 1000,
+                disable: Sequence[str] = ()) -> Iterator[tokens.Doc]:
+  """Applies the pipeline components of `nlp` on already tokenized docs.
 
+  Same as `nlp.pipe` but without running the tokenizer again.
+  """
+  for name, proc in nlp.pipeline:
+    if name in disable:
+      continue
+    if hasattr(proc, "pipe"):
+      docs = proc.pipe(docs, batch_size=batch_size)
+    else:
+      docs = map(proc, docs)
+  return iter(docs)
+
+
+def pipe_prefiltered(nlp, texts: Iterable[str],
+                     needs_parse: Callable[[tokens.Doc], bool],
+                     batch_size: int = 1000,
+                     skip_components: Sequence[str] = ("parser",),
+                     disable: Sequence[str] = ()) -> Iterator[tokens.Doc]:
+  """Runs the full pipeline only on texts that pass a tokenizer-only check.
+
+  Texts are tokenized in batches of `batch_size`. Docs for which
+  `needs_parse` is False go only through the components that are not in
+  `skip_components`. Docs are generated in the order of the given texts.
+
+  Args:
+    nlp: spaCy language object.
+    texts: Texts to process.
+    needs_parse: Function that takes a tokenized (not parsed) doc and
+      returns whether the full pipeline should be applied on it.
+    batch_size: Number of texts to tokenize and filter at once.
+    skip_components: Names of the pipeline components that are not applied
+      on docs that fail the check.
+    disable: Names of the pipeline components that are not applied on
+      any doc.
+  """
+  skip_components = list(skip_components) + list(disable)
+  texts = iter(texts)
+  n_texts, n_skipped = 0, 0
+  while True:
+    batch = [nlp.make_doc(text) for text in itertools.islice(texts, batch_size)]
+    if not batch:
+      break
+    mask = [needs_parse(doc) for doc in batch]
+    parsed = apply_pipes(nlp, [doc for doc, m in zip(batch, mask) if m],
+                         batch_size=batch_size, disable=disable)
+    skipped = apply_pipes(nlp, [doc for doc, m in zip(batch, mask) if not m],
+                          batch_size=batch_size, disable=skip_components)
+    for m in mask:
+      yield next(parsed) if m else next(skipped)
+    n_texts += len(batch)
+    n_skipped += len(batch) - sum(mask)
+
+  print("\nPrefilter skipped {} on {} / {} reviews.".format(
+      ", ".join(skip_components), n_skipped, n_texts))
+
+
+def apply_spacy(texts: Iterable[str],
+                components: Sequence[str] = PIPELINE_COMPONENTS,
+                needs_parse: Optional[Callable[[tokens.Doc], bool]] = None,
+                skip_components: Sequence[str] = ("parser",),
+                cache_dir: Optional[str] = None,
+                cache_size_mb: float = 1024) -> Iterable[tokens.Doc]:
   start_time = time.time()
-  docs = list(nlp.pipe(texts))
+  docs = list(iter_spacy(texts, components=components,
+                         needs_parse=needs_parse,
+                         skip_components=skip_components,
+                         cache_dir=cache_dir, cache_size_mb=cache_size_mb))
   print("\nApplied spacy on {} reviews.".format(len(docs)))
   print(time.time() - start_time)
 
   return docs
 
 
+def iter_spacy(texts: Iterable[str], batch_size: int = 1000,
+               components: Sequence[str] = PIPELINE_COMPONENTS,
+               needs_parse: Optional[Callable[[tokens.Doc], bool]] = None,
+               skip_components: Sequence[str] = ("parser",),
+               cache_dir: Optional[str] = None,
+               cache_size_mb: float = 1024) -> Iterator[tokens.Doc]:
+  """Streaming version of `apply_spacy`.
+
+  Docs are generated lazily in batches of `batch_size` texts, so only the
+  current batch is kept in memory instead of all docs of the corpus.
+  Only the given pipeline `components` are applied.
+  If `needs_parse` is given, it is used to skip `skip_components` on some
+  docs (see `pipe_prefiltered`).
+  If `cache_dir` is given, docs are loaded from a `doc_cache.DocCache` in
+  this directory and only texts that are not cached are parsed.
+  """
+  nlp = load_nlp(components)
+  disable = unused_components(nlp, components)
+  if needs_parse is not None:
+    parse = functools.partial(pipe_prefiltered, nlp, needs_parse=needs_parse,
+                              batch_size=batch_size,
+                              skip_components=skip_components,
+                              disable=disable)
+    # Docs that skipped components are not valid for runs without prefilter
+    variant = "prefilter-{}".format("+".join(skip_components))
+  else:
+    parse = functools.partial(nlp.pipe, batch_size=batch_size,
+                              disable=disable)
+    variant = ""
+
+  if cache_dir is None:
+    return parse(texts)
+  cache = doc_cache.DocCache(cache_dir, nlp, components, variant=variant,
+                             max_size_mb=cache_size_mb)
+  return cache.pipe(texts, parse, batch_size=batch_size)
+
+
+def consume_docs(docs: Iterable[tokens.Doc],
+                 consumers: Sequence[Callable[[tokens.Doc], Any]]
+                 ) -> List[List[Any]]:
+  """Passes each doc to all consumers before moving to the next doc.
+
+  Used with `iter_spacy` so that every doc is released as soon as all
+  consumers are done with it.
+
+  Args:
+    docs: Iterable of spaCy docs (preferably a generator).
+    consumers: Functions that take a single doc and return a result for it.
+
+  Returns:
+    One list of results per consumer, in the order of the given docs.
+  """
+  results = [[] for _ in consumers]
+  start_time = time.time()
+  for doc in docs:
+    for consumer, consumer_results in zip(consumers, results):
+      consumer_results.append(consumer(doc))
+
+  print("\nProcessed {} streamed spacy docs.".format(len(results[0])))
+  print(time.time() - start_time)
+  return results
+
+
 def apply_neuralcoref(texts: Iterable[str]) -> List[str]:
   import neuralcoref
-  nlp = spacy.load('en_core_web_sm', parse=False, tag=False, entity=False)
+  # Not the shared model of `load_nlp` because we add a component to it.
+  # Mention detection of neuralcoref uses the sentences, dependency labels
+  # and entities of the doc, so all components are loaded.
+  nlp = spacy.load(MODEL_NAME)
   nlp.add_pipe(neuralcoref.NeuralCoref(nlp.vocab), name='neuralcoref')
 
   start_time = time.time()
@@ -0,0 +1,133 @@
+"""Pipeline stages that are skipped when their saved outputs are up to date.
+
+Each stage declares its inputs (files, options and other values such as the
+lexicon checksum or the spaCy model version) and the files it creates. The
+fingerprint of a stage is the hash of all its inputs together with the
+fingerprints of the stages it depends on. After a stage runs, its
+fingerprint is written next to its first output, and the next time the
+stage is skipped if all outputs exist and the fingerprint is unchanged.
+Changing an upstream stage therefore also reruns every stage after it.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+def file_fingerprint(path: str, content: bool = True) -> str:
+  """Fingerprint of a file.
+
+  Args:
+    path: Path of the file.
+    content: If True the file content is hashed. If False only its size and
+      modification time are used, which is much faster for very large
+      files that are not expected to change (eg. word2vec models).
+  """
+  if not content:
+    stat = os.stat(path)
+    return "{}_{}".format(stat.st_size, stat.st_mtime_ns)
+  sha = hashlib.sha1()
+  with open(path, "rb") as file:
+    for block in iter(lambda: file.read(1 << 20), b""):
+      sha.update(block)
+  return sha.hexdigest()
+
+
+class Stage:
+
+  def __init__(self, name: str, run: Callable[[], Any],
+               outputs: Sequence[str],
+               files: Sequence[str] = (),
+               options: Optional[Dict[str, Any]] = None,
+               depends: Sequence["Stage"] = (),
+               hash_content: bool = True):
+    """Constructor.
+
+    Args:
+      name: Name of the stage used in messages.
+      run: Function without arguments that runs the stage and creates all
+        `outputs`.
+      outputs: Paths of the files that the stage creates. A stage without
+        outputs always runs.
+      files: Paths of input files that do not come from other stages.
+      options: Any other inputs that affect the outputs. Values must be
+        JSON serializable.
+      depends: Stages whose outputs this stage reads.
+      hash_content: Whether to hash the content of `files` or only use their
+        size and modification time (see `file_fingerprint`).
+    """
+    self.name = name
+    self.run_fn = run
+    self.outputs = list(outputs)
+    self.files = list(files)
+    self.options = dict(options or {})
+    self.depends = list(depends)
+    self.hash_content = hash_content
+    self._inputs = None
+    self._fingerprint = None
+
+  @property
+  def record_path(self) -> str:
+    return "{}.stage.json".format(self.outputs[0])
+
+  def inputs(self) -> Dict[str, Any]:
+    """Everything that the fingerprint of the stage is calculated from."""
+    # Inputs do not change while the pipeline runs so files are hashed once
+    if self._inputs is None:
+      self._inputs = {
+          "name": self.name,
+          "files": {path: file_fingerprint(path, self.hash_content)
+                    for path in self.files},
+          "options": self.options,
+          "depends": [stage.fingerprint() for stage in self.depends]}
+    return self._inputs
+
+  def fingerprint(self) -> str:
+    if self._fingerprint is None:
+      inputs = json.dumps(self.inputs(), sort_keys=True, default=str)
+      self._fingerprint = hashlib.sha1(inputs.encode("utf-8")).hexdigest()
+    return self._fingerprint
+
+  def is_valid(self) -> bool:
+    """Checks if saved outputs exist and were created from the same inputs."""
+    if not self.outputs or not os.path.exists(self.record_path):
+      return False
+    if not all(os.path.exists(path) for path in self.outputs):
+      return False
+    with open(self.record_path, "r") as file:
+      record = json.load(file)
+    return record["fingerprint"] == self.fingerprint()
+
+  def run(self, force: bool = False) -> bool:
+    """Runs the stage unless its outputs are valid.
+
+    Returns:
+      True if the stage was run and False if it was skipped.
+    """
+    if not force and self.is_valid():
+      print("Skipping stage {}: outputs are up to date.".format(self.name))
+      return False
+
+    print("Running stage {}.".format(self.name))
+    self.run_fn()
+    if self.outputs:
+      missing = [path for path in self.outputs if not os.path.exists(path)]
+      if missing:
+        raise FileNotFoundError("Stage {} did not create {}.".format(
+            self.name, ", ".join(missing)))
+      with open(self.record_path, "w") as file:
+        json.dump({"fingerprint": self.fingerprint(),
+                   "inputs": self.inputs()}, file, indent=2, default=str)
+    return True
+
+
+def run_stages(stages: List[Stage], force: Sequence[str] = ()):
+  """Runs the given stages in order.
+
+  Args:
+    stages: Stages in an order where each stage comes after its
+      dependencies.
+    force: Names of stages to run even if their outputs are valid.
+  """
+  for stage in stages:
+    stage.run(force=stage.name in force)